@@ -2,23 +2,45 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from config import Config
 from database import Database
+from utils.cache import get_cache_stats
+from utils.json_codec import MongoJSONProvider
+from utils.ops_access import ops_endpoint
+from utils.metrics import init_metrics
+from utils.compression import init_compression
+from utils.profiling import init_profiling
 from routes.movie_routes import create_movie_routes
 from routes.user_routes import create_user_routes
+from routes.person_routes import create_person_routes
+from services.typeahead_service import TypeaheadService
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = MongoJSONProvider(app)
+    app.json.use_orjson = app.json.use_orjson and Config.JSON_USE_ORJSON
     
-    CORS(app)
+    # La paginazione della ricerca viaggia nelle intestazioni: vanno esposte al browser
+    CORS(app, expose_headers=['X-Page', 'X-Has-More'])
+    init_metrics(app)
+    init_compression(app)
+    init_profiling(app)
     
     db = Database()
     db.connect()
     
     movie_routes = create_movie_routes()
     user_routes = create_user_routes()
+    person_routes = create_person_routes()
     
     app.register_blueprint(movie_routes)
     app.register_blueprint(user_routes)
+    app.register_blueprint(person_routes)
+    
+    # Indici per prefisso dei suggerimenti, costruiti una volta per processo
+    try:
+        print(f"Suggerimenti di ricerca: {TypeaheadService().build()}")
+    except Exception as e:
+        print(f"Errore nella costruzione dei suggerimenti: {e}")
     
     @app.route('/api/health')
     def health_check():
@@ -27,6 +49,11 @@ def create_app():
             'message': 'Movie API Server is running'
         }), 200
     
+    @app.route('/api/cache/stats')
+    @ops_endpoint
+    def cache_stats():
+        return jsonify(get_cache_stats()), 200
+    
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({'error': 'Endpoint non trovato'}), 404
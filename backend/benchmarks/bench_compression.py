@@ -0,0 +1,47 @@
+"""Benchmark: compressione di una pagina di film.
+
+Codifica una pagina di PAGE_SIZE film (come bench_json) e misura, per ogni
+codifica, i byte trasmessi e il tempo CPU per richiesta: identity, gzip e
+brotli ai livelli usati per le risposte dinamiche e per quelle messe in cache
+(compresse al livello alto dalla seconda richiesta dello stesso corpo e servite
+dalla cache per ETag, codifica e impronta del corpo).
+Non richiede MongoDB.
+
+Uso (dalla cartella backend):
+    python -m benchmarks.bench_compression
+"""
+import hashlib
+from flask import Flask
+from benchmarks.bench_json import load_page
+from benchmarks.common import measure, print_table
+from utils.compression import brotli, compress
+from utils.json_codec import MongoJSONProvider, to_public
+from utils.cache import TTLCache
+
+
+def main():
+    app = Flask('bench')
+    provider = MongoJSONProvider(app)
+    body = provider.dumps({'success': True, 'data': [to_public(dict(movie)) for movie in load_page()]}).encode('utf-8')
+
+    rows = [('identity', '-', len(body), '100.0%', '0.00')]
+    encodings = ['gzip'] + (['br'] if brotli is not None else [])
+    for encoding in encodings:
+        for cached in (False, True):
+            ms, compressed = measure(lambda: compress(body, encoding, cached=cached), repeat=5)
+            rows.append((encoding, 'cache' if cached else 'dinamico', len(compressed),
+                         f'{100 * len(compressed) / len(body):.1f}%', f'{ms:.2f}'))
+
+    def cache_key():
+        return ('W/"c1"', 'gzip', hashlib.blake2b(body, digest_size=16).digest())
+
+    cache = TTLCache('bench_compression', 16, 60)
+    cache.set(cache_key(), compress(body, 'gzip', cached=True))
+    lookup_ms, _ = measure(lambda: [cache.get(cache_key()) for _ in range(1000)], repeat=5)
+    rows.append(('gzip', 'lettura dalla cache', '-', '-', f'{lookup_ms / 1000:.4f}'))
+
+    print_table(['codifica', 'livello', 'byte', 'rapporto', 'ms CPU'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Benchmark: dettaglio film con $lookup sui crediti vs crediti incorporati.
+
+Genera la proiezione incorporata per i film campione, poi confronta i due
+percorsi di lettura senza passare dalla cache dei dettagli.
+
+Uso (dalla cartella backend):
+    python -m benchmarks.bench_credits
+"""
+from benchmarks.common import measure, print_table
+from services.movie_service import MovieService
+
+SAMPLE_SIZE = 200
+
+
+def main():
+    service = MovieService()
+    ids = [doc['_id'] for doc in service.collection.aggregate([
+        {'$sample': {'size': SAMPLE_SIZE}},
+        {'$project': {'_id': 1}}
+    ])]
+    service.refresh_embedded_credits(ids)
+
+    def lookup_path():
+        for movie_id in ids:
+            list(service.collection.aggregate([
+                {'$match': {'_id': movie_id}},
+                service._credits_lookup_stage()
+            ]))
+
+    def embedded_path():
+        for movie_id in ids:
+            service.collection.find_one({'_id': movie_id})
+
+    lookup_ms, _ = measure(lookup_path, repeat=3)
+    embedded_ms, _ = measure(embedded_path, repeat=3)
+    credits_plan = service.credits_collection.find({'film_id': ids[0]}).explain()['queryPlanner']['winningPlan']
+
+    print_table(['percorso', f'ms per {len(ids)} dettagli', 'ms per dettaglio'], [
+        ('$lookup', f'{lookup_ms:.1f}', f'{lookup_ms / len(ids):.3f}'),
+        ('incorporato', f'{embedded_ms:.1f}', f'{embedded_ms / len(ids):.3f}'),
+    ])
+    print(f"Piano di accesso a credits.film_id: {credits_plan}")
+
+
+if __name__ == '__main__':
+    main()
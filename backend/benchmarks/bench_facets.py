@@ -0,0 +1,135 @@
+"""Benchmark: facet in una sola aggregazione vs query separate, su un catalogo sintetico.
+
+Genera CATALOG_SIZE titoli in un database dedicato (BENCH_DATABASE_NAME,
+predefinito filmfinder_bench) per non toccare i dati reali, poi confronta
+per alcune query tipiche:
+- query separate: pagina + count_documents + una aggregazione per facet
+- $facet: pagina indicizzata + un'unica aggregazione per totale e facet
+  (get_movie_facets senza cache)
+- cache: get_movie_facets con la cache già popolata
+
+Uso (dalla cartella backend):
+    python -m benchmarks.bench_facets [--size 100000] [--reuse]
+"""
+import os
+
+os.environ['DATABASE_NAME'] = os.getenv('BENCH_DATABASE_NAME', 'filmfinder_bench')
+
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import connect_with_counter, measure, print_table
+from services.movie_service import MovieService
+
+CATALOG_SIZE = 100_000
+GENRES = ['drama', 'comedy', 'action', 'thriller', 'romance', 'crime', 'documentation',
+          'family', 'animation', 'fantasy', 'scifi', 'horror', 'history', 'war', 'music',
+          'reality', 'sport', 'western', 'european']
+COUNTRIES = ['US', 'IN', 'GB', 'JP', 'FR', 'KR', 'ES', 'CA', 'DE', 'MX', 'BR', 'IT', 'AU', 'NG', 'EG']
+CERTIFICATIONS = [None, 'G', 'PG', 'PG-13', 'R', 'TV-MA', 'TV-14', 'TV-PG', 'TV-Y']
+QUERIES = [
+    ('nessun filtro', {}),
+    ('genere', {'genres': ['drama']}),
+    ('tipo + anni', {'type': 'show', 'year_min': 2010, 'year_max': 2020}),
+    ('generi (all) + paese', {'genres': ['comedy', 'romance'], 'genres_mode': 'all', 'countries': ['US']}),
+]
+
+
+def synthetic_title(i, rng, now):
+    movie_type = 'show' if rng.random() < 0.35 else 'movie'
+    doc = {
+        '_id': f'bench{i}',
+        'title': f'Titolo sintetico {i}',
+        'type': movie_type,
+        'release_year': rng.randint(1950, 2022),
+        'runtime': rng.randint(20, 180),
+        'genres': rng.sample(GENRES, rng.randint(1, 4)),
+        'production_countries': rng.sample(COUNTRIES, rng.choice([1, 1, 1, 2])),
+        'imdb_score': round(rng.uniform(1, 9.8), 1),
+        'tmdb_popularity': round(rng.expovariate(1 / 20), 3),
+        'tmdb_score': round(rng.uniform(1, 9.8), 1),
+        'created_at': now - timedelta(minutes=i),
+        'updated_at': now - timedelta(minutes=i)
+    }
+    certification = rng.choice(CERTIFICATIONS)
+    if certification:
+        doc['age_certification'] = certification
+    if movie_type == 'show':
+        doc['seasons'] = rng.randint(1, 10)
+    return doc
+
+
+def seed(service, size):
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    service.collection.delete_many({})
+    batch = []
+    for i in range(size):
+        batch.append(synthetic_title(i, rng, now))
+        if len(batch) == 5000:
+            service.collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        service.collection.insert_many(batch, ordered=False)
+
+
+def separate_queries(service, filters, per_page=20):
+    """Quello che servirebbe senza $facet: una query per la pagina, una per il totale e una per facet"""
+    query = service._build_listing_query(filters)
+    _, _, sort_spec = service._listing_sort(None, None)
+    page = list(service.collection.find(query, dict(service.LISTING_PROJECTION)).sort(sort_spec).limit(per_page))
+    total = service.collection.count_documents(query)
+    facets = {}
+    for name, field in (('genres', 'genres'), ('countries', 'production_countries')):
+        facets[name] = list(service.collection.aggregate([
+            {'$match': query}, {'$unwind': f'${field}'},
+            {'$sortByCount': f'${field}'}, {'$limit': service.FACET_LIMIT}
+        ]))
+    facets['types'] = list(service.collection.aggregate([{'$match': query}, {'$sortByCount': '$type'}]))
+    facets['decades'] = list(service.collection.aggregate([
+        {'$match': {**query, 'release_year': {'$type': 'number'}}},
+        {'$group': {'_id': {'$subtract': ['$release_year', {'$mod': ['$release_year', 10]}]},
+                    'count': {'$sum': 1}}}
+    ]))
+    return page, total, facets
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=CATALOG_SIZE)
+    parser.add_argument('--reuse', action='store_true', help='Non rigenera il catalogo sintetico')
+    args = parser.parse_args()
+
+    counter = connect_with_counter()
+    service = MovieService()
+    if not args.reuse or service.collection.estimated_document_count() != args.size:
+        print(f'Generazione di {args.size} titoli sintetici...')
+        seed(service, args.size)
+
+    rows = []
+    for label, filters in QUERIES:
+        counter.reset()
+        separate_ms, _ = measure(lambda: separate_queries(service, filters), repeat=3)
+        separate_trips = counter.count // 3
+
+        def uncached():
+            service._facets_cache.clear()
+            return service.get_movie_facets(filters=filters)
+
+        counter.reset()
+        facet_ms, result = measure(uncached, repeat=3)
+        facet_trips = counter.count // 3
+
+        cached_ms, _ = measure(lambda: service.get_movie_facets(filters=filters), repeat=10)
+
+        rows.append((label, result['pagination']['total'],
+                     separate_trips, f'{separate_ms:.1f}',
+                     facet_trips, f'{facet_ms:.1f}', f'{cached_ms:.3f}'))
+
+    print_table(['query', 'risultati', 'round trip (separate)', 'ms (separate)',
+                 'round trip ($facet)', 'ms ($facet)', 'ms (cache)'], rows)
+
+
+if __name__ == '__main__':
+    main()
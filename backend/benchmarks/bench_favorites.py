@@ -0,0 +1,41 @@
+"""Benchmark: caricamento dei preferiti film per film vs in blocco.
+
+Uso (dalla cartella backend):
+    python -m benchmarks.bench_favorites
+"""
+from benchmarks.common import connect_with_counter, measure, print_table
+from services.movie_service import MovieService
+
+SIZES = [10, 50, 100, 200]
+
+
+def main():
+    counter = connect_with_counter()
+    service = MovieService()
+    all_ids = [doc['_id'] for doc in service.collection.find({}, {'_id': 1}).limit(max(SIZES))]
+
+    rows = []
+    for size in SIZES:
+        ids = all_ids[:size]
+
+        def one_by_one():
+            return [service.get_movie_by_id(movie_id) for movie_id in ids]
+
+        def batched():
+            return service.get_movies_by_ids(ids)
+
+        counter.reset()
+        loop_ms, _ = measure(one_by_one, repeat=3)
+        loop_trips = counter.count // 3
+
+        counter.reset()
+        batch_ms, _ = measure(batched, repeat=3)
+        batch_trips = counter.count // 3
+
+        rows.append((size, loop_trips, f'{loop_ms:.1f}', batch_trips, f'{batch_ms:.1f}'))
+
+    print_table(['preferiti', 'round trip (loop)', 'ms (loop)', 'round trip (batch)', 'ms (batch)'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark: codifica JSON di una pagina di 1000 film.
+
+Confronta il provider predefinito di Flask (con la vecchia rinomina _id -> id
+in un ciclo) con MongoJSONProvider su json standard e su orjson. Non richiede
+MongoDB: i documenti sono costruiti dal CSV del dataset.
+
+Uso (dalla cartella backend):
+    python -m benchmarks.bench_json
+"""
+import ast
+import csv
+import os
+from datetime import datetime
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from benchmarks.common import measure, print_table
+from utils.json_codec import MongoJSONProvider, orjson, to_public
+
+PAGE_SIZE = 1000
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'dataset', 'titles_netflix_with_covers.csv')
+
+
+def load_page():
+    docs = []
+    with open(DATASET, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            doc = {k: v for k, v in row.items() if v != ''}
+            doc['_id'] = ObjectId()
+            doc['genres'] = ast.literal_eval(doc['genres'])
+            doc['production_countries'] = ast.literal_eval(doc['production_countries'])
+            for key in ('imdb_score', 'tmdb_popularity', 'tmdb_score'):
+                if key in doc:
+                    doc[key] = float(doc[key])
+            doc['created_at'] = doc['updated_at'] = datetime.utcnow()
+            docs.append(doc)
+            if len(docs) == PAGE_SIZE:
+                break
+    return docs
+
+
+def main():
+    app = Flask('bench')
+    page = load_page()
+
+    def legacy():
+        movies = [dict(movie) for movie in page]
+        for movie in movies:
+            movie['id'] = str(movie['_id'])
+            del movie['_id']
+        return DefaultJSONProvider(app).dumps({'success': True, 'data': movies})
+
+    def codec(use_orjson):
+        provider = MongoJSONProvider(app)
+        provider.use_orjson = use_orjson
+
+        def encode():
+            movies = [to_public(movie) for movie in [dict(movie) for movie in page]]
+            return provider.dumps({'success': True, 'data': movies})
+        return encode
+
+    copy_ms, _ = measure(lambda: [dict(movie) for movie in page], repeat=10)
+    rows = []
+    for name, fn in [('flask default', legacy), ('MongoJSONProvider (json)', codec(False))] + \
+            ([('MongoJSONProvider (orjson)', codec(True))] if orjson else []):
+        ms, body = measure(fn, repeat=10)
+        rows.append((name, f'{ms - copy_ms:.2f}', len(body)))
+
+    print_table([f'codifica ({PAGE_SIZE} film)', 'ms', 'caratteri'], rows)
+
+
+if __name__ == '__main__':
+    main()
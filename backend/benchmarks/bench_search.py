@@ -0,0 +1,42 @@
+"""Benchmark: ricerca con regex (percorso precedente) vs indice full-text e prefisso.
+
+Uso (dalla cartella backend):
+    python -m benchmarks.bench_search
+"""
+from benchmarks.common import measure, print_table
+from services.movie_service import MovieService
+
+QUERIES = ['love', 'war', 'christmas', 'star', 'the dark', 'godfather']
+
+
+def regex_search(service, query):
+    """Replica della vecchia search_movies: regex non ancorata e risultato illimitato"""
+    regex_query = {'$regex': query, '$options': 'i'}
+    return list(service.collection.find({
+        '$or': [
+            {'title': regex_query},
+            {'description': regex_query}
+        ]
+    }).sort('created_at', -1))
+
+
+def main():
+    service = MovieService()
+
+    rows = []
+    for query in QUERIES:
+        regex_ms, regex_result = measure(lambda: regex_search(service, query))
+        text_ms, text_result = measure(lambda: service.search_movies(query))
+        prefix_ms, prefix_result = measure(lambda: service.search_movies(query, mode='prefix'))
+        rows.append((
+            query,
+            len(regex_result), f'{regex_ms:.1f}',
+            len(text_result['data']), f'{text_ms:.1f}',
+            len(prefix_result['data']), f'{prefix_ms:.1f}'
+        ))
+
+    print_table(['query', 'regex (doc)', 'regex ms', 'text (doc)', 'text ms', 'prefix (doc)', 'prefix ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
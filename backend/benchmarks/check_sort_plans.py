@@ -0,0 +1,110 @@
+"""Verifica dei piani di esecuzione degli ordinamenti dell'elenco film.
+
+Per ogni ordinamento supportato, in entrambe le direzioni, esegue explain()
+con i filtri dell'elenco (tipo, generi singoli e multipli, paesi,
+intervalli di anno, punteggio, durata e popolarità, ricerca testuale) e
+con gli ordinamenti della ricerca (rilevanza e prefisso del titolo), e
+controlla che il piano vincente non contenga uno stage SORT in memoria.
+Termina con codice 1 se almeno una combinazione ordina in memoria.
+
+Le query con $text non possono essere ordinate da un indice: per loro è
+ammesso solo un SORT limitato alla pagina (top N); un SORT senza limite
+fa fallire la verifica come per le altre query.
+
+Uso (dalla cartella backend):
+    python -m benchmarks.check_sort_plans
+"""
+import sys
+
+from benchmarks.common import print_table
+from services.movie_service import MovieService
+
+PAGE_SIZE = 20
+
+FILTERS = [
+    ('nessuno', {}),
+    ('type', {'type': 'movie'}),
+    ('genre', {'genre': 'drama'}),
+    ('type+genre', {'type': 'movie', 'genre': 'drama'}),
+    ('genres $in', {'genres': ['drama', 'comedy']}),
+    ('genres $all', {'genres': ['drama', 'crime'], 'genres_mode': 'all'}),
+    ('country', {'countries': ['US']}),
+    ('countries', {'countries': ['US', 'GB']}),
+    ('year range', {'year_min': 1990, 'year_max': 2010}),
+    ('score range', {'score_min': 7.0, 'score_max': 9.0}),
+    ('runtime range', {'runtime_min': 90, 'runtime_max': 150}),
+    ('popularity min', {'popularity_min': 10.0}),
+    ('genre+year range', {'genre': 'drama', 'year_min': 2000}),
+    ('search', {'search': 'love'}),
+]
+
+SEARCH_QUERY = 'love'
+
+
+def plan_stages(plan):
+    """Elenca gli stage di un piano (winningPlan) dalla radice alle foglie"""
+    stages = [plan]
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            stages.extend(plan_stages(plan[key]))
+    for child in plan.get('inputStages', []):
+        stages.extend(plan_stages(child))
+    return stages
+
+
+def index_names(stages):
+    return [stage['indexName'] for stage in stages if 'indexName' in stage]
+
+
+def check(cursor, is_text):
+    """(indici usati, esito, bloccante) per il piano vincente del cursore"""
+    plan = cursor.explain()['queryPlanner']['winningPlan']
+    stages = plan_stages(plan)
+    indexes = ', '.join(index_names(stages)) or '-'
+    sorts = [stage for stage in stages if stage.get('stage') == 'SORT']
+    if not sorts:
+        return indexes, 'ok', False
+    limit = sorts[0].get('limitAmount')
+    if is_text and limit and limit <= PAGE_SIZE + 1:
+        return indexes, f'SORT (top {limit}) $text, ammesso', False
+    outcome = f'SORT (top {limit})' if limit else 'SORT'
+    return indexes, outcome + (' $text' if is_text else ''), True
+
+
+def main():
+    service = MovieService()
+    projection = dict(service.LISTING_PROJECTION)
+
+    rows = []
+    blocking = 0
+
+    def record(sort, order, label, cursor, is_text):
+        nonlocal blocking
+        indexes, outcome, has_sort = check(cursor, is_text)
+        if has_sort:
+            blocking += 1
+        rows.append((sort, order, label, indexes, outcome))
+
+    for sort in service.SORT_FIELDS:
+        for order in ('desc', 'asc'):
+            _, _, sort_spec = service._listing_sort(sort, order)
+            for label, filters in FILTERS:
+                query = service._build_listing_query(filters)
+                cursor = service.collection.find(query, projection).sort(sort_spec).limit(PAGE_SIZE)
+                record(sort, order, label, cursor, '$text' in query)
+
+    # Ordinamenti della ricerca (/api/movies/search)
+    for mode in ('text', 'prefix'):
+        cursor = service._search_cursor(SEARCH_QUERY, mode, projection).limit(PAGE_SIZE)
+        record('relevance' if mode == 'text' else 'title', 'desc' if mode == 'text' else 'asc',
+               f'search {mode}', cursor, mode == 'text')
+
+    print_table(['sort', 'order', 'filtro', 'indice', 'esito'], rows)
+
+    if blocking:
+        print(f'\n{blocking} combinazioni richiedono un ordinamento in memoria')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
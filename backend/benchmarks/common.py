@@ -0,0 +1,56 @@
+import os
+import statistics
+import time
+from pymongo import MongoClient, monitoring
+from config import Config
+from database import Database
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Conta i comandi inviati a MongoDB (round trip)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.count = 0
+
+
+def connect_with_counter() -> CommandCounter:
+    """Sostituisce il client del singleton Database con uno che conta i comandi"""
+    counter = CommandCounter()
+    db = Database()
+    db.close()
+    options = db._client_options()
+    options['event_listeners'] = options['event_listeners'] + [counter]
+    db._client = MongoClient(Config.MONGODB_URI, **options)
+    db._db = db._client[Config.DATABASE_NAME]
+    db._pid = os.getpid()
+    return counter
+
+
+def measure(fn, repeat: int = 5):
+    """Esegue fn più volte e restituisce (mediana in ms, ultimo risultato)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(c).ljust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,107 @@
+"""Test di carico sugli endpoint di elenco e dettaglio film.
+
+Avviare il server (es. con configurazioni diverse di worker e thread):
+    GUNICORN_WORKERS=4 GUNICORN_THREADS=8 gunicorn -c gunicorn.conf.py wsgi:app
+
+poi, dalla cartella backend:
+    python -m benchmarks.load_test --label "4w x 8t" --concurrency 1 8 32 64
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+from benchmarks.common import print_table
+
+LISTING_PATH = '/api/movies/?per_page=50&view=card'
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_level(host, port, paths, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        local = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            path = random.choice(paths)
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            local.append((time.perf_counter() - start) * 1000)
+        connection.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies) if latencies else 0.0,
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'errors': errors[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Test di carico degli endpoint film')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--duration', type=float, default=10.0, help='secondi per livello')
+    parser.add_argument('--label', default='', help='configurazione del server, riportata nel risultato')
+    args = parser.parse_args()
+
+    url = urlparse(args.base_url)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    connection.request('GET', '/api/movies/?per_page=200&fields=title')
+    movie_ids = [movie['id'] for movie in json.loads(connection.getresponse().read())['data']]
+    connection.close()
+
+    scenarios = {
+        'elenco': [LISTING_PATH],
+        'dettaglio': [f'/api/movies/{movie_id}' for movie_id in movie_ids]
+    }
+
+    rows = []
+    for name, paths in scenarios.items():
+        for concurrency in args.concurrency:
+            result = run_level(url.hostname, url.port or 80, paths, concurrency, args.duration)
+            rows.append((args.label, name, concurrency, f"{result['rps']:.0f}",
+                         f"{result['p50']:.1f}", f"{result['p95']:.1f}", f"{result['p99']:.1f}",
+                         result['errors']))
+
+    print_table(['server', 'endpoint', 'client', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errori'], rows)
+
+
+if __name__ == '__main__':
+    main()
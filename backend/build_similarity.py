@@ -0,0 +1,34 @@
+"""Costruzione offline dei titoli simili (richiede NumPy e SciPy).
+
+Calcola la matrice delle feature di tutti i film e salva i primi K vicini
+di ciascuno nella collezione movie_similar. Va rieseguito dopo un nuovo
+caricamento del dataset; le singole creazioni e modifiche sono gestite
+in modo incrementale dall'API.
+
+Uso (dalla cartella backend):
+    python build_similarity.py
+    python build_similarity.py --top-k 30 --descriptions
+"""
+import argparse
+from config import Config
+from services.similarity_service import SimilarityService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Precalcola i titoli simili per ogni film')
+    parser.add_argument('--top-k', type=int, default=Config.SIMILAR_TOP_K)
+    parser.add_argument('--descriptions', action='store_true', default=Config.SIMILAR_USE_DESCRIPTIONS,
+                        help='aggiunge il TF-IDF delle descrizioni alle feature')
+    parser.add_argument('--batch-size', type=int, default=Config.SIMILAR_BATCH_SIZE,
+                        help='righe della matrice di similarità calcolate per blocco')
+    args = parser.parse_args()
+
+    service = SimilarityService()
+    if not service.available():
+        raise SystemExit('Installa numpy e scipy per calcolare i titoli simili')
+
+    print(f"Titoli simili: {service.build(args.top_k, args.descriptions, args.batch_size)}")
+
+
+if __name__ == '__main__':
+    main()
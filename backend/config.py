@@ -3,7 +3,99 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _int_or_none(name: str):
+    value = os.getenv(name)
+    return int(value) if value else None
+
 class Config:
     MONGODB_URI = os.getenv('MONGODB_URI')
     DATABASE_NAME = os.getenv('DATABASE_NAME')
-    DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
\ No newline at end of file
+    DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+    
+    # Cache in memoria dei dettagli film e delle statistiche
+    MOVIE_CACHE_SIZE = int(os.getenv('MOVIE_CACHE_SIZE', 1024))
+    MOVIE_CACHE_TTL = float(os.getenv('MOVIE_CACHE_TTL', 300))
+    STATISTICS_CACHE_TTL = float(os.getenv('STATISTICS_CACHE_TTL', 60))
+    FACETS_CACHE_SIZE = int(os.getenv('FACETS_CACHE_SIZE', 256))
+    FACETS_CACHE_TTL = float(os.getenv('FACETS_CACHE_TTL', 120))
+    
+    # Intervallo (secondi) dopo il quale il riepilogo statistiche viene ricalcolato da zero
+    STATISTICS_RECOMPUTE_INTERVAL = float(os.getenv('STATISTICS_RECOMPUTE_INTERVAL', 3600))
+    
+    # Crediti (attori/registi) incorporati nei documenti dei film al posto del $lookup
+    EMBED_CREDITS = os.getenv('EMBED_CREDITS', 'False').lower() == 'true'
+    
+    # Documenti per batch letti dal cursore MongoDB nelle risposte in streaming
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 200))
+    
+    # Codifica JSON con orjson quando il pacchetto è installato
+    JSON_USE_ORJSON = os.getenv('JSON_USE_ORJSON', 'True').lower() == 'true'
+    
+    # Pool di connessioni MongoDB (per processo: ogni worker ha il proprio pool)
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_IDLE_TIME_MS = _int_or_none('MONGO_MAX_IDLE_TIME_MS')
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = _int_or_none('MONGO_WAIT_QUEUE_TIMEOUT_MS')
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 20000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000))
+    MONGO_SOCKET_TIMEOUT_MS = _int_or_none('MONGO_SOCKET_TIMEOUT_MS')
+    MONGO_READ_PREFERENCE = os.getenv('MONGO_READ_PREFERENCE', 'primary')
+    
+    # bcrypt: costo dell'hash e pool di thread dedicato
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+    BCRYPT_WORKERS = int(os.getenv('BCRYPT_WORKERS', os.cpu_count() or 2))
+    BCRYPT_MAX_PENDING = int(os.getenv('BCRYPT_MAX_PENDING', 64))
+    BCRYPT_TIMEOUT = float(os.getenv('BCRYPT_TIMEOUT', 10))
+    
+    # Titoli simili: vicini precalcolati per film e modello in memoria per gli aggiornamenti
+    SIMILAR_TOP_K = int(os.getenv('SIMILAR_TOP_K', 20))
+    SIMILAR_USE_DESCRIPTIONS = os.getenv('SIMILAR_USE_DESCRIPTIONS', 'False').lower() == 'true'
+    SIMILAR_BATCH_SIZE = int(os.getenv('SIMILAR_BATCH_SIZE', 256))
+    SIMILAR_MODEL_TTL = float(os.getenv('SIMILAR_MODEL_TTL', 600))
+    
+    # Raccomandazioni dai preferiti: ricostruzione periodica e dimensione massima della sovrapposizione
+    RECOMMENDATION_REBUILD_INTERVAL = int(os.getenv('RECOMMENDATION_REBUILD_INTERVAL', 3600))
+    RECOMMENDATION_MAX_DELTA = int(os.getenv('RECOMMENDATION_MAX_DELTA', 200000))
+    
+    # Suggerimenti di ricerca: ricostruzione periodica degli indici in memoria
+    TYPEAHEAD_REBUILD_INTERVAL = int(os.getenv('TYPEAHEAD_REBUILD_INTERVAL', 600))
+    
+    # GET condizionali: durata della versione del catalogo in memoria e intestazioni Cache-Control
+    CATALOG_VERSION_TTL = float(os.getenv('CATALOG_VERSION_TTL', 1))
+    HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 0))
+    HTTP_CACHE_SHARED_MAX_AGE = int(os.getenv('HTTP_CACHE_SHARED_MAX_AGE', 60))
+    
+    # Compressione delle risposte JSON (gzip, brotli se installato)
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_GZIP_LEVEL_CACHED = int(os.getenv('COMPRESSION_GZIP_LEVEL_CACHED', 9))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+    COMPRESSION_BROTLI_QUALITY_CACHED = int(os.getenv('COMPRESSION_BROTLI_QUALITY_CACHED', 9))
+    COMPRESSION_CACHE_SIZE = int(os.getenv('COMPRESSION_CACHE_SIZE', 256))
+    COMPRESSION_CACHE_TTL = float(os.getenv('COMPRESSION_CACHE_TTL', 600))
+    
+    # Pagina del film: thread per le letture parallele (dettaglio, preferiti, simili)
+    MOVIE_PAGE_WORKERS = int(os.getenv('MOVIE_PAGE_WORKERS', 8))
+    
+    # Endpoint operativi (metriche, statistiche di cache e hashing): disabilitati salvo
+    # OPS_ENDPOINTS_ENABLED; con OPS_TOKEN richiedono Authorization: Bearer <token>
+    OPS_ENDPOINTS_ENABLED = os.getenv('OPS_ENDPOINTS_ENABLED', 'False').lower() == 'true'
+    OPS_TOKEN = os.getenv('OPS_TOKEN', '')
+    
+    # Metriche (/api/metrics): soglia e numero dei campioni di query lente
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_SLOW_QUERY_MS = float(os.getenv('METRICS_SLOW_QUERY_MS', 100))
+    METRICS_SLOW_QUERY_SAMPLES = int(os.getenv('METRICS_SLOW_QUERY_SAMPLES', 50))
+    # Ogni worker gunicorn ha i propri contatori: con una cartella condivisa
+    # (impostata da gunicorn.conf.py) /api/metrics somma quelli di tutti i
+    # worker, scritti ogni METRICS_FLUSH_INTERVAL secondi. Senza cartella le
+    # metriche sono del solo worker che risponde. I campioni di
+    # /api/metrics/slow-queries restano sempre per worker
+    METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+    
+    # Profilazione su richiesta (X-Profile: 1 o ?profile=1): da abilitare solo per le indagini
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILING_TOP_N = int(os.getenv('PROFILING_TOP_N', 25))
+    PROFILING_SORT = os.getenv('PROFILING_SORT', 'cumulative')
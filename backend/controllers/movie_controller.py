@@ -1,10 +1,54 @@
 from flask import request, jsonify
 from services.movie_service import MovieService
+from services.movie_page_service import MoviePageService
+from services.catalog_version_service import CatalogVersionService
+from utils.http_cache import conditional_get
+from utils.streaming import requested_stream_mode, stream_response
 from marshmallow import ValidationError
 
 class MovieController:
     def __init__(self):
         self.movie_service = MovieService()
+        self.movie_page_service = MoviePageService()
+    
+    def _requested_fields(self):
+        """Campi richiesti con ?fields=a,b oppure ?view=card (None = documento completo)"""
+        if request.args.get('view') == 'card':
+            return list(MovieService.CARD_FIELDS)
+        if request.args.get('fields'):
+            return [field.strip() for field in request.args.get('fields').split(',') if field.strip()]
+        return None
+    
+    def _list_param(self, name):
+        """Parametro con valori separati da virgola (anche ripetuto: ?genres=a&genres=b)"""
+        values = []
+        for raw in request.args.getlist(name):
+            values.extend(value.strip() for value in raw.split(',') if value.strip())
+        return values
+    
+    def _requested_filters(self):
+        """Filtri dell'elenco dalla query string; ValueError se un valore non è valido"""
+        filters = {}
+        for name in ('type', 'genre', 'genres_mode', 'search'):
+            if request.args.get(name):
+                filters[name] = request.args.get(name)
+        for name in ('genres', 'countries', 'age_certification'):
+            values = self._list_param(name)
+            if values:
+                filters[name] = values
+        
+        numeric = {'year': int, 'min_score': float}
+        for name in ('year', 'runtime', 'seasons'):
+            numeric[f'{name}_min'] = numeric[f'{name}_max'] = int
+        for name in ('score', 'popularity'):
+            numeric[f'{name}_min'] = numeric[f'{name}_max'] = float
+        for name, cast in numeric.items():
+            if request.args.get(name):
+                try:
+                    filters[name] = cast(request.args.get(name))
+                except ValueError:
+                    raise ValueError(f"Valore non valido per {name}")
+        return filters
     
     def create_movie(self):
         """POST /movies - Crea un nuovo film"""
@@ -22,6 +66,7 @@ class MovieController:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @conditional_get(CatalogVersionService.current)
     def get_movie(self, movie_id):
         """GET /movies/<id> - Recupera un film per ID"""
         try:
@@ -34,6 +79,7 @@ class MovieController:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @conditional_get(CatalogVersionService.current)
     def get_all_movies(self):
         """GET /movies - Recupera tutti i film con filtri e paginazione"""
         try:
@@ -41,25 +87,103 @@ class MovieController:
             page = int(request.args.get('page', 1))
             per_page = min(int(request.args.get('per_page', 500)), 1000)  # Max 100
             
-            # Filtri
-            filters = {}
-            if request.args.get('type'):
-                filters['type'] = request.args.get('type')
-            if request.args.get('genre'):
-                filters['genre'] = request.args.get('genre')
-            if request.args.get('year'):
-                filters['year'] = int(request.args.get('year'))
-            if request.args.get('min_score'):
-                filters['min_score'] = float(request.args.get('min_score'))
-            if request.args.get('search'):
-                filters['search'] = request.args.get('search')
-            
-            result = self.movie_service.get_all_movies(page, per_page, filters)
+            filters = self._requested_filters()
+            
+            # Paginazione a cursore: presente il parametro cursor (vuoto per la prima pagina)
+            cursor = request.args.get('cursor') if 'cursor' in request.args else None
+            count = request.args.get('count', 'exact' if cursor is None else 'none')
+            if count not in ('exact', 'estimated', 'none'):
+                return jsonify({'error': 'Parametro count non valido'}), 400
+            
+            fields = self._requested_fields()
+            
+            stream_mode = requested_stream_mode()
+            
+            result = self.movie_service.get_all_movies(page, per_page, filters, cursor, count, fields,
+                                                       stream=stream_mode is not None,
+                                                       sort=request.args.get('sort'),
+                                                       order=request.args.get('order'))
+            
+            if result['success'] and stream_mode:
+                pagination = result['pagination']
+                return stream_response(result['data'], stream_mode, key='data',
+                                       head={'success': True},
+                                       tail=lambda: {'pagination': pagination})
+            elif result['success']:
+                return jsonify(result), 200
+            else:
+                return jsonify({'error': result['error']}), 400
+        except ValueError as ve:
+            return jsonify({'error': str(ve)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @conditional_get(CatalogVersionService.current)
+    def get_movie_facets(self):
+        """GET /movies/facets - Pagina di film con i conteggi per genere, tipo, decennio e paese"""
+        try:
+            page = int(request.args.get('page', 1))
+            per_page = min(int(request.args.get('per_page', 20)), 100)
+            filters = self._requested_filters()
+            
+            result = self.movie_service.get_movie_facets(page, per_page, filters, self._requested_fields(),
+                                                         sort=request.args.get('sort'),
+                                                         order=request.args.get('order'))
             
             if result['success']:
                 return jsonify(result), 200
             else:
                 return jsonify({'error': result['error']}), 400
+        except ValueError as ve:
+            return jsonify({'error': str(ve)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    def autocomplete(self):
+        """GET /movies/autocomplete - Suggerimenti di titoli e persone per prefisso"""
+        try:
+            query = request.args.get('q', '')
+            limit = min(int(request.args.get('limit', 8)), 20)
+            
+            result = self.movie_service.autocomplete(query, limit)
+            
+            if result['success']:
+                return jsonify(result['data']), 200
+            else:
+                return jsonify({'error': result['error']}), 500
+        except ValueError:
+            return jsonify({'error': 'Parametro limit non valido'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    def get_movie_page(self, movie_id):
+        """GET /movies/<id>/page?user_id=&similar=N - Film, stato dei preferiti e titoli simili"""
+        try:
+            similar = min(int(request.args.get('similar', 0)), 50)
+            result = self.movie_page_service.get_movie_page(movie_id, request.args.get('user_id'), similar,
+                                                            self._requested_fields() or list(MovieService.CARD_FIELDS))
+            
+            if result['success']:
+                return jsonify(result['data']), 200
+            else:
+                return jsonify({'error': result['error']}), 404
+        except ValueError:
+            return jsonify({'error': 'Parametro similar non valido'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    def get_similar_movies(self, movie_id):
+        """GET /movies/<id>/similar - Titoli simili per contenuto"""
+        try:
+            limit = min(int(request.args.get('limit', 10)), 50)
+            result = self.movie_service.get_similar_movies(movie_id, limit, self._requested_fields())
+            
+            if result['success']:
+                return jsonify(result['data']), 200
+            else:
+                return jsonify({'error': result['error']}), 404
+        except ValueError as ve:
+            return jsonify({'error': str(ve)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -91,6 +215,7 @@ class MovieController:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @conditional_get(CatalogVersionService.current)
     def get_statistics(self):
         """GET /movies/statistics - Ottiene statistiche sui film"""
         try:
@@ -110,10 +235,17 @@ class MovieController:
             if not query:
                 return jsonify({'error': 'Query di ricerca richiesta'}), 400
             
-            result = self.movie_service.search_movies(query)
+            page = int(request.args.get('page', 1))
+            per_page = min(int(request.args.get('per_page', 50)), 100)
+            mode = request.args.get('mode', 'text')
+            
+            result = self.movie_service.search_movies(query, page, per_page, mode, self._requested_fields())
             
             if result['success']:
-                return jsonify(result['data']), 200
+                response = jsonify(result['data'])
+                response.headers['X-Page'] = str(result['pagination']['page'])
+                response.headers['X-Has-More'] = str(result['pagination']['has_more']).lower()
+                return response, 200
             else:
                 return jsonify({'error': result['error']}), 400
         except ValidationError as ve:
@@ -0,0 +1,40 @@
+from flask import request, jsonify
+from services.person_service import PersonService
+
+class PersonController:
+    def __init__(self):
+        self.person_service = PersonService()
+    
+    def search_people(self):
+        """GET /people/search - Cerca attori e registi per prefisso del nome"""
+        try:
+            query = request.args.get('q', '')
+            if not query.strip():
+                return jsonify({'error': 'Query di ricerca richiesta'}), 400
+            
+            limit = min(int(request.args.get('limit', 20)), 100)
+            result = self.person_service.search_people(query, limit, request.args.get('role'))
+            
+            if result['success']:
+                return jsonify(result['data']), 200
+            else:
+                return jsonify({'error': result['error']}), 400
+        except ValueError:
+            return jsonify({'error': 'Parametro limit non valido'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    def get_filmography(self, person_id):
+        """GET /people/<id>/filmography - Titoli di un attore o regista"""
+        try:
+            exclude = [film_id for film_id in request.args.get('exclude', '').split(',') if film_id]
+            result = self.person_service.get_filmography(person_id, request.args.get('role'), exclude)
+            
+            if result['success']:
+                return jsonify(result['data']), 200
+            elif result['error'] == 'Ruolo non valido':
+                return jsonify({'error': result['error']}), 400
+            else:
+                return jsonify({'error': result['error']}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
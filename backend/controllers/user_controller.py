@@ -2,12 +2,19 @@ from flask import request, jsonify
 from marshmallow import ValidationError
 from services.user_service import UserService
 from services.movie_service import MovieService
+from utils.streaming import requested_stream_mode, stream_response
+from utils.ops_access import ops_endpoint
 
 class UserController:
     def __init__(self):
         self.user_service = UserService()
         self.movie_service = MovieService()
     
+    def _busy_response(self, error):
+        response = jsonify({'error': error})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
     def create_user(self):
         """POST /users - Crea un nuovo utente"""
         try:
@@ -19,6 +26,8 @@ class UserController:
 
             if result['success']:
                 return jsonify(result['data']), 201
+            elif result.get('busy'):
+                return self._busy_response(result['error'])
             else:
                 return jsonify({'error': result['error']}), 400
         except ValidationError as ve:
@@ -55,6 +64,8 @@ class UserController:
             
             if result['success']:
                 return jsonify(result['data']), 200
+            elif result.get('busy'):
+                return self._busy_response(result['error'])
             else:
                 return jsonify({'error': result['error']}), 401
         except Exception as e:
@@ -63,9 +74,12 @@ class UserController:
     def get_all_users(self):
         """GET /users - Recupera tutti gli utenti"""
         try:
-            result = self.user_service.get_all_users()
+            stream_mode = requested_stream_mode()
+            result = self.user_service.get_all_users(stream=stream_mode is not None)
             
-            if result['success']:
+            if result['success'] and stream_mode:
+                return stream_response(result['data'], stream_mode)
+            elif result['success']:
                 return jsonify(result['data']), 200
             else:
                 return jsonify({'error': result['error']}), 400
@@ -134,6 +148,31 @@ class UserController:
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    def sync_favorite_movies(self, user_id):
+        """POST /users/<id>/favorites/bulk - Aggiunge e rimuove più preferiti in una volta"""
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({'error': 'Dati JSON richiesti'}), 400
+
+            add = data.get('add', [])
+            remove = data.get('remove', [])
+            if not isinstance(add, list) or not isinstance(remove, list):
+                return jsonify({'error': 'add e remove devono essere liste di movie_id'}), 400
+            if not all(isinstance(movie_id, str) and movie_id for movie_id in add + remove):
+                return jsonify({'error': 'movie_id non valido'}), 400
+
+            result = self.user_service.sync_favorite_movies(user_id, add, remove)
+
+            if result['success']:
+                return jsonify(result['data']), 200
+            elif result['error'] == 'Utente non trovato':
+                return jsonify({'error': result['error']}), 404
+            else:
+                return jsonify({'error': result['error']}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     def get_favorite_movies(self, user_id):
         """GET /users/<id>/favorites - Recupera la lista dei film preferiti con dettagli completi"""
         try:
@@ -142,18 +181,44 @@ class UserController:
             if not favorite_ids_result.get('success'):
                 return jsonify({'error': favorite_ids_result.get('error', 'Utente non trovato')}), 404
 
-            detailed_favorite_movies = []
             movie_ids = favorite_ids_result.get('data', [])
+            movies_result = self.movie_service.get_movies_by_ids(movie_ids)
+            
+            if not movies_result.get('success'):
+                return jsonify({'error': movies_result['error']}), 500
+
+            detailed_favorite_movies = movies_result['data']
+            for movie_id in movies_result['missing']:
+                print(f"Attenzione: il film con ID {movie_id} non è stato trovato.")
+
+            return jsonify({
+                'favorite_movies': detailed_favorite_movies,
+                'missing_movies': movies_result['missing']
+            }), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
 
-            for movie_id in movie_ids:
-                movie_details_result = self.movie_service.get_movie_by_id(movie_id)
+    def get_recommendations(self, user_id):
+        """GET /users/<id>/recommendations - Film consigliati in base ai preferiti"""
+        try:
+            limit = min(int(request.args.get('limit', 20)), 100)
+            result = self.user_service.get_recommendations(user_id, limit)
 
-                if movie_details_result.get('success'):
-                    detailed_favorite_movies.append(movie_details_result['data'])
-                else:
-                    print(f"Attenzione: il film con ID {movie_id} non è stato trovato.")
+            if not result['success']:
+                return jsonify({'error': result['error']}), 404
 
-            return jsonify({'favorite_movies': detailed_favorite_movies}), 200
+            scores = {item['id']: item['score'] for item in result['data']}
+            movies_result = self.movie_service.get_movies_by_ids(list(scores))
+            if not movies_result['success']:
+                return jsonify({'error': movies_result['error']}), 500
+
+            recommendations = []
+            for movie in movies_result['data']:
+                movie['recommendation_score'] = scores[movie['id']]
+                recommendations.append(movie)
+            return jsonify(recommendations), 200
+        except ValueError:
+            return jsonify({'error': 'Parametro limit non valido'}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
@@ -167,4 +232,13 @@ class UserController:
             else:
                 return jsonify({'error': result['error']}), 404
         except Exception as e:
-            return jsonify({'error': str(e)}), 500
\ No newline at end of file
+            return jsonify({'error': str(e)}), 500
+
+    @ops_endpoint
+    def get_auth_stats(self):
+        """GET /users/auth/stats - Metriche di hashing delle password"""
+        try:
+            result = self.user_service.get_password_hasher_stats()
+            return jsonify(result['data']), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
@@ -1,25 +1,50 @@
+import os
 from pymongo import MongoClient
 from config import Config
+from utils.metrics import command_listener
 
 class Database:
     _instance = None
     _client = None
     _db = None
+    _pid = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
         return cls._instance
     
+    def _client_options(self):
+        """Opzioni del pool di connessioni lette da Config"""
+        return {
+            'maxPoolSize': Config.MONGO_MAX_POOL_SIZE,
+            'minPoolSize': Config.MONGO_MIN_POOL_SIZE,
+            'maxIdleTimeMS': Config.MONGO_MAX_IDLE_TIME_MS,
+            'waitQueueTimeoutMS': Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            'connectTimeoutMS': Config.MONGO_CONNECT_TIMEOUT_MS,
+            'serverSelectionTimeoutMS': Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            'socketTimeoutMS': Config.MONGO_SOCKET_TIMEOUT_MS,
+            'readPreference': Config.MONGO_READ_PREFERENCE,
+            # Nessuna connessione finché non serve: il client può essere creato prima di un fork
+            'connect': False,
+            # Durate e documenti restituiti di ogni comando, per /api/metrics e la profilazione
+            'event_listeners': [command_listener] if Config.METRICS_ENABLED or Config.PROFILING_ENABLED else []
+        }
+    
     def connect(self):
+        if self._client is not None and self._pid != os.getpid():
+            # Processo figlio dopo un fork: il client del padre non va riutilizzato
+            self._client = None
+            self._db = None
         if self._client is None:
-            self._client = MongoClient(Config.MONGODB_URI)
+            self._client = MongoClient(Config.MONGODB_URI, **self._client_options())
             self._db = self._client[Config.DATABASE_NAME]
+            self._pid = os.getpid()
             print(f"Connesso a MongoDB: {Config.DATABASE_NAME}")
         return self._db
     
     def get_collection(self, collection_name=None):
-        if self._db is None:
+        if self._db is None or self._pid != os.getpid():
             self.connect()
         collection_name = collection_name or Config.COLLECTION_NAME
         return self._db[collection_name]
@@ -28,4 +53,4 @@ class Database:
         if self._client:
             self._client.close()
             self._client = None
-            self._db = None
\ No newline at end of file
+            self._db = None
@@ -0,0 +1,40 @@
+# =============================================================================
+# Configurazione gunicorn (gunicorn -c gunicorn.conf.py wsgi:app)
+# =============================================================================
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Processi worker, ciascuno con un pool di thread: le richieste passano la
+# maggior parte del tempo in attesa di MongoDB, quindi i thread aumentano il
+# throughput senza moltiplicare la memoria. Tenere MONGO_MAX_POOL_SIZE >= threads.
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Riavvio periodico dei worker per contenere la crescita della memoria
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+# L'app (e il client MongoDB) deve essere creata dopo il fork, in ogni worker
+preload_app = False
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Metriche aggregate tra i worker: ognuno scrive i propri contatori in questa
+# cartella, svuotata all'avvio del master (un riavvio azzera i contatori)
+metrics_dir = os.environ.setdefault('METRICS_MULTIPROC_DIR',
+                                    os.path.join(tempfile.gettempdir(), 'filmfinder-metrics'))
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
@@ -0,0 +1,71 @@
+"""Caricamento del dataset Netflix in MongoDB.
+
+Uso (dalla cartella backend):
+    python ingest.py                      # titoli e crediti, indici a fine caricamento
+    python ingest.py --resume             # riprende dall'ultimo blocco completato
+    python ingest.py --drop-indexes       # rimuove gli indici prima del caricamento
+"""
+import argparse
+import os
+from config import Config
+from services.ingestion_service import IngestionService
+from services.statistics_service import StatisticsService
+from services.catalog_version_service import CatalogVersionService
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset')
+
+
+def build_indexes():
+    """Crea gli indici dopo il caricamento tramite i servizi che li definiscono:
+    MovieService per film e crediti, PersonService per la ricerca di persone"""
+    from services.movie_service import MovieService
+    from services.person_service import PersonService
+    MovieService()
+    PersonService()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carica i CSV del dataset Netflix in MongoDB')
+    parser.add_argument('--titles', default=os.path.join(DATASET_DIR, 'titles_netflix_with_covers.csv'))
+    parser.add_argument('--credits', default=os.path.join(DATASET_DIR, 'credits_netflix.csv'))
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--checkpoint', default=os.path.join(DATASET_DIR, '.ingest_checkpoint.json'))
+    parser.add_argument('--resume', action='store_true', help="riprende dall'ultimo checkpoint")
+    parser.add_argument('--drop-indexes', action='store_true', help='rimuove gli indici prima del caricamento')
+    parser.add_argument('--skip-indexes', action='store_true', help='non crea gli indici a fine caricamento')
+    parser.add_argument('--embed-credits', action='store_true',
+                        help='incorpora attori e registi nei documenti dei film (anche con EMBED_CREDITS=true)')
+    parser.add_argument('--skip-titles', action='store_true')
+    parser.add_argument('--skip-credits', action='store_true')
+    args = parser.parse_args()
+
+    service = IngestionService(chunk_size=args.chunk_size, checkpoint_path=args.checkpoint)
+    if not args.resume:
+        service.clear_checkpoint()
+    if args.drop_indexes:
+        service.drop_indexes()
+
+    if not args.skip_titles:
+        print(f"Titoli: {service.ingest_titles(args.titles, resume=args.resume)}")
+    if not args.skip_credits:
+        print(f"Crediti: {service.ingest_credits(args.credits, resume=args.resume)}")
+
+    if not args.skip_indexes:
+        build_indexes()
+        print("Indici creati")
+
+    if args.embed_credits or Config.EMBED_CREDITS:
+        from services.movie_service import MovieService
+        print(f"Crediti incorporati: {MovieService().refresh_embedded_credits()}")
+
+    StatisticsService().recompute()
+    print("Statistiche ricalcolate")
+
+    # Invalida ETag e cache HTTP delle risposte già servite
+    CatalogVersionService.record_change()
+
+    service.clear_checkpoint()
+
+
+if __name__ == '__main__':
+    main()
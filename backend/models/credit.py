@@ -0,0 +1,8 @@
+from marshmallow import Schema, fields, validate
+
+class CreditSchema(Schema):
+    person_id = fields.Int(required=True)
+    film_id = fields.Str(required=True, validate=validate.Length(min=1))
+    name = fields.Str(required=True, validate=validate.Length(min=1))
+    character = fields.Str()
+    role = fields.Str(required=True, validate=validate.OneOf(['ACTOR', 'DIRECTOR']))
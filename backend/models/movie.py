@@ -53,7 +53,7 @@ class MovieSchema(Schema):
     id = fields.Str(dump_only=True)
     title = fields.Str(required=True, validate=validate.Length(min=1, max=200))
     type = fields.Str(required=True, validate=validate.OneOf(['movie', 'show']))
-    description = fields.Str(validate=validate.Length(max=1000))
+    description = fields.Str(validate=validate.Length(max=2000))
     release_year = fields.Int(validate=validate.Range(min=1800, max=2030))
     age_certification = fields.Str(validate=validate.Length(max=10))
     runtime = fields.Int(validate=validate.Range(min=1))
@@ -1,5 +1,5 @@
-import bcrypt
 from marshmallow import Schema, fields, validate, post_load, validates, ValidationError
+from utils.passwords import password_hasher
 
 class User:
     def __init__(self, id=None, username=None, email=None, password=None, favorite_movies=None):
@@ -10,11 +10,10 @@ class User:
         self.favorite_movies = favorite_movies or []
 
     def hash_password(self, raw_password: str) -> str:
-        hashed = bcrypt.hashpw(raw_password.encode('utf-8'), bcrypt.gensalt())
-        return hashed.decode('utf-8')
+        return password_hasher.hash(raw_password)
 
     def check_password(self, raw_password: str) -> bool:
-        return bcrypt.checkpw(raw_password.encode('utf-8'), self.password.encode('utf-8'))
+        return password_hasher.verify(raw_password, self.password)
 
     def add_favorite_movie(self, movie_id: str):
         """Aggiunge un film ai preferiti se non è già presente"""
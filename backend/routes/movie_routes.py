@@ -9,8 +9,12 @@ def create_movie_routes():
     movie_bp.add_url_rule('/', 'get_all_movies', movie_controller.get_all_movies, methods=['GET'])
     movie_bp.add_url_rule('/<movie_id>', 'get_movie', movie_controller.get_movie, methods=['GET'])
     movie_bp.add_url_rule('/<movie_id>', 'update_movie', movie_controller.update_movie, methods=['PUT'])
+    movie_bp.add_url_rule('/<movie_id>/page', 'get_movie_page', movie_controller.get_movie_page, methods=['GET'])
+    movie_bp.add_url_rule('/<movie_id>/similar', 'get_similar_movies', movie_controller.get_similar_movies, methods=['GET'])
     movie_bp.add_url_rule('/<movie_id>', 'delete_movie', movie_controller.delete_movie, methods=['DELETE'])
     movie_bp.add_url_rule('/statistics', 'get_statistics', movie_controller.get_statistics, methods=['GET'])
+    movie_bp.add_url_rule('/autocomplete', 'autocomplete', movie_controller.autocomplete, methods=['GET'])
+    movie_bp.add_url_rule('/facets', 'get_movie_facets', movie_controller.get_movie_facets, methods=['GET'])
     movie_bp.add_url_rule('/search', 'search_movies', movie_controller.search_movies, methods=['GET'])
 
     return movie_bp
\ No newline at end of file
@@ -0,0 +1,11 @@
+from flask import Blueprint
+from controllers.person_controller import PersonController
+
+def create_person_routes():
+    person_bp = Blueprint('people', __name__, url_prefix='/api/people')
+    person_controller = PersonController()
+
+    person_bp.add_url_rule('/search', 'search_people', person_controller.search_people, methods=['GET'])
+    person_bp.add_url_rule('/<int:person_id>/filmography', 'get_filmography', person_controller.get_filmography, methods=['GET'])
+
+    return person_bp
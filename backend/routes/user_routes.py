@@ -8,12 +8,15 @@ def create_user_routes():
     user_bp.add_url_rule('/', 'create_user', user_controller.create_user, methods=['POST'])
     user_bp.add_url_rule('/', 'get_all_users', user_controller.get_all_users, methods=['GET'])
     user_bp.add_url_rule('/login', 'login_user', user_controller.login_user, methods=['POST'])
+    user_bp.add_url_rule('/auth/stats', 'get_auth_stats', user_controller.get_auth_stats, methods=['GET'])
     user_bp.add_url_rule('/<user_id>', 'get_user', user_controller.get_user, methods=['GET'])
     user_bp.add_url_rule('/<user_id>', 'delete_user', user_controller.delete_user, methods=['DELETE'])
     user_bp.add_url_rule('/<user_id>', 'update_user', user_controller.update_user, methods=['PUT'])
 
+    user_bp.add_url_rule('/<user_id>/recommendations', 'get_recommendations', user_controller.get_recommendations, methods=['GET'])
     user_bp.add_url_rule('/<user_id>/favorites', 'add_favorite_movie', user_controller.add_favorite_movie, methods=['POST'])
     user_bp.add_url_rule('/<user_id>/favorites', 'get_favorite_movies', user_controller.get_favorite_movies, methods=['GET'])
+    user_bp.add_url_rule('/<user_id>/favorites/bulk', 'sync_favorite_movies', user_controller.sync_favorite_movies, methods=['POST'])
     user_bp.add_url_rule('/<user_id>/favorites/<movie_id>', 'remove_favorite_movie', user_controller.remove_favorite_movie, methods=['DELETE'])
     user_bp.add_url_rule('/<user_id>/favorites/<movie_id>', 'check_favorite_movie', user_controller.check_favorite_movie, methods=['GET'])
 
@@ -0,0 +1,72 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Tuple
+
+from pymongo import ReturnDocument
+
+from config import Config
+from database import Database
+
+
+class CatalogVersionService:
+    """Contatore di versione dell'intero catalogo, incrementato a ogni scrittura
+    sui film e a ogni caricamento del dataset. Serve a generare ETag e
+    Last-Modified senza interrogare i dati: il valore letto è tenuto in
+    memoria per CATALOG_VERSION_TTL secondi"""
+    
+    VERSION_ID = 'catalog'
+    
+    _lock = threading.Lock()
+    _cached = None  # (versione, modificato il, letto alle)
+    
+    @staticmethod
+    def _collection():
+        return Database().get_collection("catalog_version")
+    
+    @staticmethod
+    def _as_utc(value: datetime) -> datetime:
+        # MongoDB restituisce datetime senza fuso orario, sempre in UTC (al millisecondo)
+        return value.replace(tzinfo=timezone.utc)
+    
+    @classmethod
+    def current(cls) -> Tuple[int, datetime]:
+        """Versione corrente e data dell'ultima modifica del catalogo"""
+        cached = cls._cached
+        if cached is not None and time.monotonic() - cached[2] < Config.CATALOG_VERSION_TTL:
+            return cached[0], cached[1]
+        
+        document = cls._collection().find_one({'_id': cls.VERSION_ID})
+        if document is None:
+            # Catalogo caricato prima del contatore: la prima lettura lo inizializza
+            return cls.bump()
+        return cls._remember(document)
+    
+    @classmethod
+    def bump(cls) -> Tuple[int, datetime]:
+        """Registra una modifica del catalogo"""
+        document = cls._collection().find_one_and_update(
+            {'_id': cls.VERSION_ID},
+            {'$inc': {'version': 1}, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return cls._remember(document)
+    
+    @classmethod
+    def record_change(cls):
+        """bump() per i percorsi di scrittura: un errore non deve far fallire la scrittura"""
+        try:
+            cls.bump()
+        except Exception as e:
+            print(f"Errore nell'aggiornamento della versione del catalogo: {e}")
+    
+    @classmethod
+    def _remember(cls, document) -> Tuple[int, datetime]:
+        version, modified = document['version'], cls._as_utc(document['updated_at'])
+        with cls._lock:
+            cached = cls._cached
+            # Una lettura più lenta non deve sovrascrivere una versione più recente
+            if cached is None or version >= cached[0] or time.monotonic() - cached[2] >= Config.CATALOG_VERSION_TTL:
+                cls._cached = (version, modified, time.monotonic())
+        return version, modified
@@ -0,0 +1,181 @@
+from database import Database
+from models.movie import MovieSchema
+from models.credit import CreditSchema
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime
+from itertools import islice
+import ast
+import csv
+import hashlib
+import json
+import os
+import time
+
+class IngestionService:
+    """Caricamento in blocco dei CSV del dataset Netflix (titoli e crediti)"""
+    
+    LIST_FIELDS = ('genres', 'production_countries')
+    INT_FIELDS = ('release_year', 'runtime', 'seasons', 'imdb_votes')
+    FLOAT_FIELDS = ('imdb_score', 'tmdb_popularity', 'tmdb_score')
+    
+    def __init__(self, chunk_size: int = 1000, checkpoint_path: Optional[str] = None):
+        self.db = Database()
+        self.movie_collection = self.db.get_collection("movie")
+        self.credits_collection = self.db.get_collection("credits")
+        self.movie_schema = MovieSchema()
+        self.credit_schema = CreditSchema()
+        self.chunk_size = chunk_size
+        self.checkpoint_path = checkpoint_path
+    
+    # --- Checkpoint -------------------------------------------------------
+    
+    def _load_checkpoint(self) -> Dict:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _save_checkpoint(self, checkpoint: Dict):
+        if not self.checkpoint_path:
+            return
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+    
+    def clear_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+    
+    # --- Parsing ----------------------------------------------------------
+    
+    def _read_chunks(self, path: str, skip_rows: int) -> Iterator[List[Dict]]:
+        """Legge il CSV a blocchi di chunk_size righe, saltando quelle già caricate"""
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for _ in islice(reader, skip_rows):
+                pass
+            while True:
+                chunk = list(islice(reader, self.chunk_size))
+                if not chunk:
+                    break
+                yield chunk
+    
+    def parse_title(self, row: Dict) -> Dict:
+        """Converte una riga del CSV dei titoli nei tipi del documento film.
+        Il tipo nel dataset è maiuscolo (MOVIE/SHOW): viene salvato minuscolo
+        come per i titoli creati dall'API"""
+        doc = {}
+        for key, value in row.items():
+            if value is None or value == '':
+                continue
+            if key in self.LIST_FIELDS:
+                value = ast.literal_eval(value)
+                if not isinstance(value, list):
+                    raise ValueError(f"{key} non è una lista")
+            elif key in self.INT_FIELDS:
+                value = int(float(value))
+            elif key in self.FLOAT_FIELDS:
+                value = float(value)
+            elif key == 'type':
+                value = value.lower()
+            doc[key] = value
+        return doc
+    
+    def parse_credit(self, row: Dict) -> Dict:
+        """Converte una riga del CSV dei crediti. Nel CSV _id è l'id della persona,
+        che compare in più righe: la chiave del credito è derivata dall'intera riga"""
+        doc = {
+            'person_id': int(row['_id']),
+            'film_id': row['film_id'],
+            'name': row['name'],
+            'role': row['role']
+        }
+        if row.get('character'):
+            doc['character'] = row['character']
+        key = '|'.join([doc['film_id'], str(doc['person_id']), doc['role'], doc.get('character', '')])
+        doc['_id'] = hashlib.md5(key.encode('utf-8')).hexdigest()[:24]
+        return doc
+    
+    def _validate_titles(self, docs: List[Dict]) -> Dict:
+        """Valida il blocco con MovieSchema"""
+        views = [{k: v for k, v in doc.items() if k != '_id'} for doc in docs]
+        return self.movie_schema.validate(views, many=True)
+    
+    def _validate_credits(self, docs: List[Dict]) -> Dict:
+        views = [{k: v for k, v in doc.items() if k != '_id'} for doc in docs]
+        return self.credit_schema.validate(views, many=True)
+    
+    # --- Scrittura --------------------------------------------------------
+    
+    def _bulk_upsert(self, collection, docs: List[Dict], now: datetime) -> Tuple[int, int, int]:
+        """Upsert non ordinato per _id: rieseguire il caricamento non duplica i documenti"""
+        operations = []
+        for doc in docs:
+            fields = {k: v for k, v in doc.items() if k != '_id'}
+            operations.append(UpdateOne(
+                {'_id': doc['_id']},
+                {'$set': fields, '$setOnInsert': {'created_at': now, 'updated_at': now}},
+                upsert=True
+            ))
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            return result.upserted_count, result.modified_count, 0
+        except BulkWriteError as bwe:
+            details = bwe.details
+            return details.get('nUpserted', 0), details.get('nModified', 0), len(details.get('writeErrors', []))
+    
+    def _ingest(self, name: str, path: str, collection, parse, validate, resume: bool) -> Dict:
+        checkpoint = self._load_checkpoint()
+        skip_rows = checkpoint.get(name, 0) if resume else 0
+        stats = {'read': 0, 'inserted': 0, 'updated': 0, 'invalid': 0, 'errors': 0, 'skipped': skip_rows}
+        start = time.perf_counter()
+        
+        for chunk in self._read_chunks(path, skip_rows):
+            docs = []
+            for row in chunk:
+                try:
+                    docs.append(parse(row))
+                except (ValueError, SyntaxError, KeyError) as e:
+                    stats['invalid'] += 1
+                    print(f"[{name}] riga non valida ({e}): {row.get('_id')}")
+            
+            errors = validate(docs)
+            for index in sorted(errors, reverse=True):
+                stats['invalid'] += 1
+                print(f"[{name}] {docs[index].get('_id')} scartato: {errors[index]}")
+                del docs[index]
+            
+            if docs:
+                inserted, updated, write_errors = self._bulk_upsert(collection, docs, datetime.utcnow())
+                stats['inserted'] += inserted
+                stats['updated'] += updated
+                stats['errors'] += write_errors
+            
+            stats['read'] += len(chunk)
+            checkpoint[name] = skip_rows + stats['read']
+            self._save_checkpoint(checkpoint)
+            
+            elapsed = time.perf_counter() - start
+            print(f"[{name}] {skip_rows + stats['read']} righe ({stats['read'] / elapsed:.0f} righe/s)")
+        
+        stats['seconds'] = round(time.perf_counter() - start, 2)
+        stats['rows_per_second'] = round(stats['read'] / stats['seconds']) if stats['seconds'] else 0
+        return stats
+    
+    def ingest_titles(self, path: str, resume: bool = False) -> Dict:
+        """Carica il CSV dei titoli nella collezione movie"""
+        return self._ingest('titles', path, self.movie_collection,
+                            self.parse_title, self._validate_titles, resume)
+    
+    def ingest_credits(self, path: str, resume: bool = False) -> Dict:
+        """Carica il CSV dei crediti nella collezione credits"""
+        return self._ingest('credits', path, self.credits_collection,
+                            self.parse_credit, self._validate_credits, resume)
+    
+    def drop_indexes(self):
+        """Rimuove gli indici secondari, da ricostruire a fine caricamento"""
+        self.movie_collection.drop_indexes()
+        self.credits_collection.drop_indexes()
@@ -0,0 +1,76 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from bson import ObjectId
+from config import Config
+from services.movie_service import MovieService
+from services.user_service import UserService
+
+
+class MoviePageService:
+    """Dati della pagina di un film in una sola chiamata: dettaglio con i crediti,
+    stato dei preferiti dell'utente e, a richiesta, titoli simili.
+    Le letture sono indipendenti e vengono eseguite in parallelo su un pool
+    di thread condiviso, così la latenza è quella della più lenta"""
+
+    _lock = threading.Lock()
+    _executor: Optional[ThreadPoolExecutor] = None
+    _pid: Optional[int] = None
+
+    def __init__(self):
+        self.movie_service = MovieService()
+        self.user_service = UserService()
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        # I thread non sopravvivono a un fork: ogni processo crea il proprio pool
+        with cls._lock:
+            if cls._executor is None or cls._pid != os.getpid():
+                cls._executor = ThreadPoolExecutor(max_workers=Config.MOVIE_PAGE_WORKERS,
+                                                   thread_name_prefix='movie-page')
+                cls._pid = os.getpid()
+            return cls._executor
+
+    def get_movie_page(self, movie_id: str, user_id: Optional[str] = None, similar: int = 0,
+                       similar_fields: Optional[List[str]] = None) -> Dict:
+        """Film con i crediti, is_favorite (None senza utente) e i primi `similar` titoli simili.
+        Se l'utente o i titoli simili non sono disponibili la pagina viene restituita lo stesso"""
+        try:
+            if user_id and not ObjectId.is_valid(user_id):
+                return {'success': False, 'error': 'ID utente non valido'}
+
+            executor = self._get_executor()
+
+            def submit(fn, *args):
+                # Nel contesto della richiesta, così la profilazione conta anche questi comandi
+                return executor.submit(contextvars.copy_context().run, fn, *args)
+
+            movie_future = submit(self.movie_service.get_movie_by_id, movie_id)
+            favorite_future = submit(self.user_service.is_favorite_movie, user_id, movie_id) \
+                if user_id else None
+            similar_future = submit(self.movie_service.get_similar_movies, movie_id,
+                                    similar, similar_fields) if similar > 0 else None
+
+            movie = movie_future.result()
+            if not movie['success']:
+                return movie
+
+            is_favorite = None
+            if favorite_future is not None:
+                favorite = favorite_future.result()
+                is_favorite = favorite['data']['is_favorite'] if favorite['success'] else False
+
+            similar_movies = []
+            if similar_future is not None:
+                result = similar_future.result()
+                similar_movies = result['data'] if result['success'] else []
+
+            return {'success': True, 'data': {
+                'movie': movie['data'],
+                'is_favorite': is_favorite,
+                'similar': similar_movies
+            }}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
@@ -1,57 +1,255 @@
 from database import Database
+from config import Config
+from utils.cache import TTLCache
+from utils.json_codec import to_public
+from services.statistics_service import StatisticsService
+from services.similarity_service import SimilarityService
+from services.typeahead_service import TypeaheadService
+from services.catalog_version_service import CatalogVersionService
 from models.movie import Movie, MovieSchema
-from bson import ObjectId
+from bson import ObjectId, json_util
+from pymongo import ReturnDocument, UpdateOne
 from pymongo.errors import DuplicateKeyError
 from typing import List, Dict, Optional, Any
 from datetime import datetime
+import base64
 
 class MovieService:
+    # Ordinamenti supportati dall'elenco, con la direzione predefinita
+    SORT_FIELDS = {
+        'created_at': -1,
+        'imdb_score': -1,
+        'tmdb_popularity': -1,
+        'release_year': -1,
+        'title': 1
+    }
+    DEFAULT_SORT = 'created_at'
+    SEARCH_MAX_RESULTS = 500
+    TITLE_COLLATION = {'locale': 'en', 'strength': 2}
+    # I crediti incorporati servono solo al dettaglio, non agli elenchi
+    LISTING_PROJECTION = {'actors': 0, 'directors': 0}
+    PROJECTABLE_FIELDS = (
+        'title', 'type', 'description', 'release_year', 'age_certification',
+        'runtime', 'genres', 'production_countries', 'seasons', 'imdb_id',
+        'imdb_score', 'imdb_votes', 'tmdb_popularity', 'tmdb_score',
+        'cover_url', 'created_at', 'updated_at'
+    )
+    # Rappresentazione compatta per le griglie del frontend
+    CARD_FIELDS = ('title', 'release_year', 'cover_url', 'imdb_score', 'tmdb_score')
+    
+    # Cache condivise tra tutte le istanze del servizio
+    # Voci marcate con la versione del catalogo: una scrittura servita da un
+    # altro worker rende obsolete anche le voci di questo processo
+    _detail_cache = TTLCache('movie_detail', Config.MOVIE_CACHE_SIZE, Config.MOVIE_CACHE_TTL, versioned=True)
+    _statistics_cache = TTLCache('movie_statistics', 1, Config.STATISTICS_CACHE_TTL, versioned=True)
+    _facets_cache = TTLCache('movie_facets', Config.FACETS_CACHE_SIZE, Config.FACETS_CACHE_TTL, versioned=True)
+    # Numero massimo di valori restituiti per i facet con molti valori distinti
+    FACET_LIMIT = 30
+    # Indici a campo singolo sostituiti dagli indici composti di cui sono prefisso
+    REPLACED_INDEXES = ('title_1', 'type_1', 'release_year_-1', 'imdb_score_-1',
+                        'genres_1', 'production_countries_1')
+    
     def __init__(self):
         self.db = Database()
         self.collection = self.db.get_collection("movie")
+        self.credits_collection = self.db.get_collection("credits")
         self.schema = MovieSchema()
+        self.statistics_service = StatisticsService()
+        self.similarity_service = SimilarityService()
+        self.typeahead_service = TypeaheadService()
         self._create_indexes()
     
     def _create_indexes(self):
-        """Crea indici per ottimizzare le query"""
+        """Crea indici per ottimizzare le query.
+        Per ogni ordinamento c'è un indice (campo, _id), da solo e preceduto dai
+        filtri di uguaglianza (tipo, genere, paese), così che queste combinazioni
+        non richiedano un SORT in memoria. Gli intervalli (anno, punteggio, durata,
+        popolarità) vengono dopo l'ordinamento (uguaglianza, ordinamento, intervallo):
+        sono verificati scorrendo l'indice dell'ordinamento, oppure, se più
+        selettivi, letti dal proprio indice con un SORT limitato alla pagina.
+        Le ricerche $text non possono usare un indice per l'ordinamento"""
         try:
-            self.collection.create_index([("title", 1)])
-            self.collection.create_index([("type", 1)])
-            self.collection.create_index([("release_year", -1)])
-            self.collection.create_index([("imdb_score", -1)])
+            existing = self.collection.index_information()
+            for name in self.REPLACED_INDEXES:
+                if name in existing:
+                    self.collection.drop_index(name)
+            
             self.collection.create_index([("tmdb_score", -1)])
-            self.collection.create_index([("genres", 1)])
+            self.collection.create_index([("age_certification", 1)])
+            self.collection.create_index([("runtime", 1)])
+            self.collection.create_index([("seasons", 1)], sparse=True)
             self.collection.create_index([("imdb_id", 1)], unique=True, sparse=True)
+            for field, direction in self.SORT_FIELDS.items():
+                self.collection.create_index([(field, direction), ("_id", direction)])
+                self.collection.create_index([("type", 1), (field, direction), ("_id", direction)])
+                self.collection.create_index([("genres", 1), (field, direction), ("_id", direction)])
+                self.collection.create_index([("production_countries", 1), (field, direction), ("_id", direction)])
+            self.collection.create_index(
+                [("title", "text"), ("description", "text")],
+                weights={'title': 10, 'description': 2},
+                name='movie_text_search'
+            )
+            self.collection.create_index([("title", 1)], name='title_ci', collation=self.TITLE_COLLATION)
         except Exception as e:
             print(f"Errore nella creazione degli indici: {e}")
+        
+        try:
+            self.credits_collection.create_index([("film_id", 1)])
+        except Exception as e:
+            print(f"Errore nella creazione degli indici dei crediti: {e}")
     
     def create_movie(self, movie_data: Dict) -> Dict:
         """Crea un nuovo film"""
         try:
             movie_obj = self.schema.load(movie_data)
             movie_dict = movie_obj.to_dict()
+            if Config.EMBED_CREDITS:
+                movie_dict['actors'] = []
+                movie_dict['directors'] = []
             
-            result = self.collection.insert_one(movie_dict)
-            movie_dict['id'] = str(result.inserted_id)
+            self.collection.insert_one(movie_dict)
+            self.similarity_service.update_title(movie_dict)
+            self.typeahead_service.update_title(movie_dict)
+            to_public(movie_dict)
+            self.statistics_service.apply_change(new=movie_dict)
+            self._statistics_cache.clear()
+            self._facets_cache.clear()
+            CatalogVersionService.record_change()
             
             return {'success': True, 'data': movie_dict}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _credits_lookup_stage(self) -> Dict:
+        """Stage $lookup che unisce i crediti al film"""
+        return {
+            '$lookup': {
+                'from': 'credits',
+                'localField': '_id',
+                'foreignField': 'film_id',
+                'as': 'credits'
+            }
+        }
+    
+    def _split_credits(self, credits: List[Dict]) -> Dict:
+        """Separa i crediti in attori e registi"""
+        split = {'actors': [], 'directors': []}
+        
+        for credit in credits:
+            credit_data = {
+                'id': str(credit['_id']),
+                'name': credit['name'],
+                'character': credit.get('character', ''),
+                'role': credit['role']
+            }
+            if 'person_id' in credit:
+                credit_data['person_id'] = credit['person_id']
+            if credit['role'] == 'ACTOR':
+                split['actors'].append(credit_data)
+            elif credit['role'] == 'DIRECTOR':
+                split['directors'].append(credit_data)
+        
+        return split
+    
+    def _format_movie_with_credits(self, movie: Dict) -> Dict:
+        """Converte l'id e separa i crediti in attori e registi"""
+        to_public(movie)
+        movie.update(self._split_credits(movie.pop('credits', [])))
+        return movie
+    
+    def _format_embedded_movie(self, movie: Dict) -> Optional[Dict]:
+        """Formatta un film con crediti già incorporati; None se non sono ancora stati generati"""
+        if 'actors' not in movie:
+            return None
+        to_public(movie)
+        movie.setdefault('directors', [])
+        return movie
+    
+    def refresh_embedded_credits(self, movie_ids: Optional[List[str]] = None) -> Dict:
+        """Ricostruisce la proiezione denormalizzata actors/directors sui film
+        a partire dalla collezione credits (tutti i film o solo quelli indicati)"""
+        try:
+            pipeline = []
+            if movie_ids is not None:
+                pipeline.append({'$match': {'film_id': {'$in': movie_ids}}})
+            pipeline.append({'$group': {'_id': '$film_id', 'credits': {'$push': '$$ROOT'}}})
+            
+            operations = []
+            touched = []
+            for group in self.credits_collection.aggregate(pipeline, allowDiskUse=True):
+                touched.append(group['_id'])
+                operations.append(UpdateOne(
+                    {'_id': group['_id']},
+                    {'$set': self._split_credits(group['credits'])}
+                ))
+                if len(operations) >= 1000:
+                    self.collection.bulk_write(operations, ordered=False)
+                    operations = []
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+            
+            # I film senza crediti ricevono liste vuote
+            without_credits = {'_id': {'$nin': touched}}
+            if movie_ids is not None:
+                touched_ids = set(touched)
+                without_credits = {'_id': {'$in': [i for i in movie_ids if i not in touched_ids]}}
+            self.collection.update_many(without_credits, {'$set': {'actors': [], 'directors': []}})
+            
+            for movie_id in (movie_ids if movie_ids is not None else touched):
+                self._detail_cache.invalidate(movie_id)
+            
+            return {'success': True, 'data': {'movies_with_credits': len(touched)}}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    @staticmethod
+    def _cache_version() -> Optional[int]:
+        """Versione del catalogo con cui leggere e marcare le voci delle cache,
+        letta prima della query. None (cache ignorate) se non disponibile"""
+        try:
+            return CatalogVersionService.current()[0]
+        except Exception as e:
+            print(f"Errore nella lettura della versione del catalogo: {e}")
+            return None
+    
     def get_movie_by_id(self, movie_id: str) -> Dict:
+        """Recupera un film con i crediti, passando dalla cache dei dettagli"""
+        version = self._cache_version()
+        cached = self._detail_cache.get(movie_id, version=version)
+        if cached is not None:
+            return {'success': True, 'data': dict(cached)}
+        
+        result = self._load_movie_by_id(movie_id)
+        if result['success']:
+            self._detail_cache.set(movie_id, dict(result['data']), version=version)
+        return result
+    
+    @staticmethod
+    def _id_filter(movie_id: str) -> Dict:
+        """Filtro per _id: i titoli del dataset hanno id stringa ("tm84618"),
+        quelli creati dall'API un ObjectId"""
+        if ObjectId.is_valid(movie_id):
+            return {'_id': {'$in': [movie_id, ObjectId(movie_id)]}}
+        return {'_id': movie_id}
+    
+    @staticmethod
+    def _ids_filter(movie_ids: List[str]) -> Dict:
+        """Come _id_filter, per più film"""
+        return {'_id': {'$in': list(movie_ids) + [ObjectId(i) for i in movie_ids if ObjectId.is_valid(i)]}}
+    
+    def _load_movie_by_id(self, movie_id: str) -> Dict:
         try:
+            if Config.EMBED_CREDITS:
+                movie = self.collection.find_one(self._id_filter(movie_id))
+                movie = self._format_embedded_movie(movie) if movie else None
+                if movie is not None:
+                    return {'success': True, 'data': movie}
+            
             pipeline = [
                 {
-                    '$match': {'_id': movie_id}
+                    '$match': self._id_filter(movie_id)
                 },
-                {
-                    '$lookup': {
-                        'from': 'credits',
-                        'localField': '_id',
-                        'foreignField': 'film_id',
-                        'as': 'credits'
-                    }
-                }
+                self._credits_lookup_stage()
             ]
             
             print(f"movie_id: {movie_id}")
@@ -60,68 +258,346 @@ class MovieService:
             if not result:
                 return {'success': False, 'error': 'Film non trovato'}
             
-            movie = result[0]
-            movie['id'] = str(movie['_id'])
-            del movie['_id']
+            movie = self._format_movie_with_credits(result[0])
             
-            movie['actors'] = []
-            movie['directors'] = []
+            return {'success': True, 'data': movie}
             
-            for credit in movie['credits']:
-                credit_data = {
-                    'id': str(credit['_id']),
-                    'name': credit['name'],
-                    'character': credit.get('character', ''),
-                    'role': credit['role']
-                }
-                if credit['role'] == 'ACTOR':
-                    movie['actors'].append(credit_data)
-                elif credit['role'] == 'DIRECTOR':
-                    movie['directors'].append(credit_data)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def get_movies_by_ids(self, movie_ids: List[str]) -> Dict:
+        """Recupera più film con i rispettivi crediti in un'unica aggregazione,
+        mantenendo l'ordine degli ID richiesti"""
+        try:
+            ordered_ids = list(dict.fromkeys(movie_ids))
+            if not ordered_ids:
+                return {'success': True, 'data': [], 'missing': []}
             
-            del movie['credits']
+            movies_by_id = {}
+            version = self._cache_version()
+            for movie_id in ordered_ids:
+                cached = self._detail_cache.get(movie_id, version=version)
+                if cached is not None:
+                    movies_by_id[movie_id] = dict(cached)
             
-            return {'success': True, 'data': movie}
+            to_load = [movie_id for movie_id in ordered_ids if movie_id not in movies_by_id]
+            if to_load and Config.EMBED_CREDITS:
+                for movie in self.collection.find(self._ids_filter(to_load)):
+                    movie = self._format_embedded_movie(movie)
+                    if movie is not None:
+                        movies_by_id[movie['id']] = movie
+                        self._detail_cache.set(movie['id'], dict(movie), version=version)
+                to_load = [movie_id for movie_id in to_load if movie_id not in movies_by_id]
             
+            if to_load:
+                pipeline = [
+                    {
+                        '$match': self._ids_filter(to_load)
+                    },
+                    self._credits_lookup_stage()
+                ]
+                
+                for movie in self.collection.aggregate(pipeline):
+                    movie = self._format_movie_with_credits(movie)
+                    movies_by_id[movie['id']] = movie
+                    self._detail_cache.set(movie['id'], dict(movie), version=version)
+            
+            movies = [movies_by_id[movie_id] for movie_id in ordered_ids if movie_id in movies_by_id]
+            missing = [movie_id for movie_id in ordered_ids if movie_id not in movies_by_id]
+            
+            return {'success': True, 'data': movies, 'missing': missing}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _encode_cursor(self, sort_field: str, direction: int, value: Any, last_id: Any) -> str:
+        """Codifica la posizione dell'ultimo film restituito in un cursore opaco"""
+        payload = json_util.dumps({'s': sort_field, 'd': direction, 'v': value, 'id': last_id})
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    def _decode_cursor(self, cursor: str) -> Dict:
+        """Decodifica un cursore prodotto da _encode_cursor"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            position = json_util.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if not {'s', 'd', 'v', 'id'} <= set(position):
+                raise ValueError
+            return position
+        except Exception:
+            raise ValueError('Cursore non valido')
+    
+    def _id_conditions(self, direction: int, last_id: Any) -> List[Dict]:
+        """Predicati su _id per i documenti successivi a last_id.
+        Gli _id sono stringhe (dataset) o ObjectId (titoli creati dall'API):
+        MongoDB ordina le stringhe prima degli ObjectId, ma $lt/$gt confrontano
+        solo valori dello stesso tipo, quindi il passaggio da un tipo all'altro
+        va aggiunto esplicitamente"""
+        conditions = [{'$lt' if direction < 0 else '$gt': last_id}]
+        if direction > 0 and isinstance(last_id, str):
+            conditions.append({'$type': 'objectId'})
+        elif direction < 0 and isinstance(last_id, ObjectId):
+            conditions.append({'$type': 'string'})
+        return conditions
+    
+    def _keyset_condition(self, sort_field: str, direction: int, value: Any, last_id: Any) -> Dict:
+        """Condizione che seleziona i documenti successivi a (value, last_id).
+        I valori mancanti/null stanno in fondo negli ordinamenti decrescenti
+        e in cima in quelli crescenti"""
+        op = '$lt' if direction < 0 else '$gt'
+        ties = self._id_conditions(direction, last_id)
+        if value is None:
+            if direction < 0:
+                return {'$or': [{sort_field: None, '_id': tie} for tie in ties]}
+            return {'$or': [{sort_field: {'$ne': None}}]
+                    + [{sort_field: None, '_id': tie} for tie in ties]}
+        
+        conditions = [{sort_field: {op: value}}] + [{sort_field: value, '_id': tie} for tie in ties]
+        if direction < 0:
+            conditions.append({sort_field: None})
+        return {'$or': conditions}
+    
+    def _listing_projection(self, fields: Optional[List[str]]) -> Dict:
+        """Proiezione MongoDB per gli elenchi: i campi richiesti (più _id) o
+        il documento completo senza i crediti incorporati"""
+        if not fields:
+            return self.LISTING_PROJECTION
+        
+        unknown = [field for field in fields if field not in self.PROJECTABLE_FIELDS]
+        if unknown:
+            raise ValueError(f"Campi non validi: {', '.join(unknown)}")
+        return {field: 1 for field in fields}
+    
+    def _range_predicate(self, filters: Dict, name: str, cast) -> Optional[Dict]:
+        """Predicato {$gte, $lte} da <name>_min/<name>_max (None se assenti)"""
+        low, high = filters.get(f'{name}_min'), filters.get(f'{name}_max')
+        low = cast(low) if low is not None else None
+        high = cast(high) if high is not None else None
+        if low is not None and high is not None and low > high:
+            raise ValueError(f"Intervallo non valido per {name}")
+        
+        predicate = {}
+        if low is not None:
+            predicate['$gte'] = low
+        if high is not None:
+            predicate['$lte'] = high
+        return predicate or None
+    
+    def _build_listing_query(self, filters: Optional[Dict]) -> Dict:
+        """Traduce i filtri dell'elenco in una query MongoDB.
+        Oltre ai filtri storici (genre, year, min_score) supporta intervalli
+        <campo>_min/<campo>_max per year, runtime, score, popularity e seasons, più generi
+        (genres_mode any/all), paesi di produzione e certificazioni.
+        I valori singoli diventano uguaglianze, così da poter usare gli indici
+        composti con i campi di ordinamento"""
+        query = {}
+        if not filters:
+            return query
+        
+        if filters.get('type'):
+            query['type'] = filters['type'].lower()
+        
+        genres = [g.lower() for g in filters.get('genres') or []]
+        if filters.get('genre'):
+            genres.append(filters['genre'].lower())
+        genres = list(dict.fromkeys(genres))
+        if len(genres) == 1:
+            query['genres'] = genres[0]
+        elif genres:
+            mode = filters.get('genres_mode', 'any')
+            if mode not in ('any', 'all'):
+                raise ValueError('Modalità generi non valida')
+            query['genres'] = {'$all' if mode == 'all' else '$in': genres}
+        
+        countries = list(dict.fromkeys(c.upper() for c in filters.get('countries') or []))
+        if countries:
+            query['production_countries'] = countries[0] if len(countries) == 1 else {'$in': countries}
+        
+        certifications = list(dict.fromkeys(filters.get('age_certification') or []))
+        if certifications:
+            query['age_certification'] = (certifications[0] if len(certifications) == 1
+                                          else {'$in': certifications})
+        
+        if filters.get('year') is not None:
+            query['release_year'] = int(filters['year'])
+        else:
+            year_range = self._range_predicate(filters, 'year', int)
+            if year_range:
+                query['release_year'] = year_range
+        
+        score_range = self._range_predicate(filters, 'score', float)
+        if filters.get('min_score') is not None:
+            score_range = {**(score_range or {}), '$gte': float(filters['min_score'])}
+        if score_range:
+            query['imdb_score'] = score_range
+        
+        runtime_range = self._range_predicate(filters, 'runtime', int)
+        if runtime_range:
+            query['runtime'] = runtime_range
+        
+        popularity_range = self._range_predicate(filters, 'popularity', float)
+        if popularity_range:
+            query['tmdb_popularity'] = popularity_range
+        
+        seasons_range = self._range_predicate(filters, 'seasons', int)
+        if seasons_range:
+            query['seasons'] = seasons_range
+        
+        if filters.get('search'):
+            query['$text'] = {'$search': filters['search']}
+        return query
+    
+    def _listing_sort(self, sort: Optional[str], order: Optional[str]):
+        """Campo e direzione di ordinamento; _id fa da spareggio nella stessa direzione"""
+        sort_field = sort or self.DEFAULT_SORT
+        if sort_field not in self.SORT_FIELDS:
+            raise ValueError('Ordinamento non valido')
+        if order not in (None, 'asc', 'desc'):
+            raise ValueError('Direzione di ordinamento non valida')
+        
+        direction = self.SORT_FIELDS[sort_field]
+        if order:
+            direction = 1 if order == 'asc' else -1
+        return sort_field, direction, [(sort_field, direction), ('_id', direction)]
+    
+    def _count_movies(self, query: Dict, count: str) -> Optional[int]:
+        """Conta i film secondo la modalità richiesta: exact, estimated o none"""
+        if count == 'none':
+            return None
+        if count == 'estimated' and not query:
+            return self.collection.estimated_document_count()
+        return self.collection.count_documents(query)
+    
     def get_all_movies(self, page: int = 1, per_page: int = 20, 
-                      filters: Dict = None) -> Dict:
-        """Recupera tutti i film con paginazione e filtri"""
+                      filters: Dict = None, cursor: Optional[str] = None,
+                      count: str = 'exact', fields: Optional[List[str]] = None,
+                      stream: bool = False, sort: Optional[str] = None,
+                      order: Optional[str] = None) -> Dict:
+        """Recupera tutti i film con paginazione e filtri.
+        Se cursor non è None usa la paginazione a cursore (keyset) al posto di skip;
+        fields limita i campi restituiti (proiezione eseguita da MongoDB).
+        Con stream=True 'data' è un generatore e pagination è completa solo
+        dopo averlo consumato. sort/order scelgono uno degli ordinamenti di SORT_FIELDS"""
         try:
-            skip = (page - 1) * per_page
-            query = {}
-
-            if filters:
-                if 'type' in filters:
-                    query['type'] = filters['type']
-                if 'genre' in filters:
-                    query['genres'] = {'$in': [filters['genre']]}
-                if 'year' in filters:
-                    query['release_year'] = filters['year']
-                if 'min_score' in filters:
-                    query['imdb_score'] = {'$gte': float(filters['min_score'])}
-                if 'search' in filters:
-                    query['$or'] = [
-                        {'title': {'$regex': filters['search'], '$options': 'i'}},
-                        {'description': {'$regex': filters['search'], '$options': 'i'}}
-                    ]
-            
-            total = self.collection.count_documents(query)
-            
-            movies = list(self.collection.find(query)
-                         .skip(skip)
-                         .limit(per_page)
-                         .sort('created_at', -1))
-            
-            for movie in movies:
-                movie['id'] = str(movie['_id'])
-                del movie['_id']
+            projection = self._listing_projection(fields)
+            query = self._build_listing_query(filters)
+            sort_field, direction, sort_spec = self._listing_sort(sort, order)
+            total = self._count_movies(query, count)
+            strip_sort_field = False
+            
+            if cursor is None:
+                skip = (page - 1) * per_page
+                db_cursor = (self.collection.find(query, projection)
+                             .sort(sort_spec)
+                             .skip(skip)
+                             .limit(per_page))
+                limit = None
+                pagination = {'page': page, 'per_page': per_page}
+                if total is not None:
+                    pagination['total'] = total
+                    pagination['pages'] = (total + per_page - 1) // per_page
+            else:
+                page_query = dict(query)
+                if cursor:
+                    position = self._decode_cursor(cursor)
+                    if position['s'] != sort_field or position['d'] != direction:
+                        raise ValueError('Il cursore appartiene a un altro ordinamento')
+                    page_query['$and'] = [self._keyset_condition(
+                        sort_field, direction, position['v'], position['id']
+                    )]
+                
+                # Il campo di ordinamento serve a costruire il cursore successivo
+                if fields and sort_field not in fields:
+                    projection = {**projection, sort_field: 1}
+                    strip_sort_field = True
+                
+                db_cursor = (self.collection.find(page_query, projection)
+                             .sort(sort_spec)
+                             .limit(per_page + 1))
+                limit = per_page
+                pagination = {'per_page': per_page, 'has_more': False, 'next_cursor': None}
+                if total is not None:
+                    pagination['total'] = total
+            
+            movies = self._iterate_listing(
+                db_cursor.batch_size(Config.STREAM_BATCH_SIZE),
+                pagination, sort_field, direction, limit, strip_sort_field
+            )
             
             return {
                 'success': True,
-                'data': movies,
+                'data': movies if stream else list(movies),
+                'pagination': pagination
+            }
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def _facet_pipeline(self, query: Dict) -> List[Dict]:
+        """Una sola aggregazione: totale e conteggi per genere, tipo, decennio e
+        paese calcolati sugli stessi documenti, ridotti ai soli campi dei facet"""
+        return [
+            {'$match': query},
+            {'$project': {'genres': 1, 'type': 1, 'release_year': 1, 'production_countries': 1}},
+            {'$facet': {
+                'total': [{'$count': 'count'}],
+                'genres': [
+                    {'$unwind': '$genres'},
+                    {'$sortByCount': '$genres'},
+                    {'$limit': self.FACET_LIMIT}
+                ],
+                'types': [{'$sortByCount': '$type'}],
+                'decades': [
+                    {'$match': {'release_year': {'$type': 'number'}}},
+                    {'$group': {
+                        '_id': {'$subtract': ['$release_year', {'$mod': ['$release_year', 10]}]},
+                        'count': {'$sum': 1}
+                    }},
+                    {'$sort': {'_id': -1}}
+                ],
+                'countries': [
+                    {'$unwind': '$production_countries'},
+                    {'$sortByCount': '$production_countries'},
+                    {'$limit': self.FACET_LIMIT}
+                ]
+            }}
+        ]
+    
+    def get_movie_facets(self, page: int = 1, per_page: int = 20, filters: Dict = None,
+                         fields: Optional[List[str]] = None, sort: Optional[str] = None,
+                         order: Optional[str] = None) -> Dict:
+        """Pagina di film e conteggi dei facet per la query corrente.
+        La pagina è una find() ordinata sugli indici dell'elenco, i conteggi una
+        sola aggregazione $facet: un ordinamento dentro $facet non può usare
+        indici e avverrebbe in memoria sull'intero insieme filtrato.
+        Le risposte senza ricerca testuale sono messe in cache
+        (svuotata a ogni scrittura sul catalogo)"""
+        try:
+            query = self._build_listing_query(filters)
+            projection = self._listing_projection(fields)
+            _, _, sort_spec = self._listing_sort(sort, order)
+            
+            cache_key = None
+            version = self._cache_version()
+            if '$text' not in query:
+                cache_key = json_util.dumps([query, sort_spec, page, per_page, sorted(projection)],
+                                            sort_keys=True)
+                cached = self._facets_cache.get(cache_key, version=version)
+                if cached is not None:
+                    return dict(cached)
+            
+            movies = (self.collection.find(query, projection)
+                      .sort(sort_spec)
+                      .skip((page - 1) * per_page)
+                      .limit(per_page))
+            data = [to_public(movie) for movie in movies]
+            facets = next(self.collection.aggregate(self._facet_pipeline(query), allowDiskUse=True))
+            
+            total = facets['total'][0]['count'] if facets['total'] else 0
+            result = {
+                'success': True,
+                'data': data,
+                'facets': {
+                    name: [{'value': bucket['_id'], 'count': bucket['count']} for bucket in facets[name]]
+                    for name in ('genres', 'types', 'decades', 'countries')
+                },
                 'pagination': {
                     'page': page,
                     'per_page': per_page,
@@ -129,25 +605,66 @@ class MovieService:
                     'pages': (total + per_page - 1) // per_page
                 }
             }
+            
+            if cache_key is not None:
+                self._facets_cache.set(cache_key, dict(result), version=version)
+            return result
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _iterate_listing(self, db_cursor, pagination: Dict, sort_field: str, direction: int,
+                         limit: Optional[int], strip_sort_field: bool):
+        """Scorre il cursore convertendo un documento alla volta.
+        In modalità keyset (limit impostato) il documento in più indica che
+        esistono altre pagine; next_cursor viene scritto in pagination alla fine"""
+        returned = 0
+        last_position = None
+        try:
+            for movie in db_cursor:
+                if limit is not None and returned == limit:
+                    pagination['has_more'] = True
+                    pagination['next_cursor'] = self._encode_cursor(sort_field, direction, *last_position)
+                    break
+                
+                last_position = (movie.get(sort_field), movie['_id'])
+                if strip_sort_field:
+                    movie.pop(sort_field, None)
+                returned += 1
+                yield to_public(movie)
+        finally:
+            db_cursor.close()
+    
+    def _invalidate_movie(self, movie_id: str):
+        """Rimuove dalle cache i dati che dipendono dal film modificato"""
+        self._detail_cache.invalidate(movie_id)
+        self._statistics_cache.clear()
+        self._facets_cache.clear()
+        CatalogVersionService.record_change()
+    
     def update_movie(self, movie_id: str, update_data: Dict) -> Dict:
-        """Aggiorna un film"""
+        """Aggiorna un film. Vengono scritti solo i campi presenti nella richiesta:
+        to_dict() restituisce tutti i campi del modello, anche quelli non inviati"""
         try:
-            if not ObjectId.is_valid(movie_id):
-                return {'success': False, 'error': 'ID non valido'}
-            
             movie_obj = self.schema.load(update_data, partial=True)
-            update_dict = movie_obj.to_dict()
+            # load() rifiuta i campi sconosciuti: i campi caricati sono quelli inviati
+            supplied = set(update_data) & set(self.schema.load_fields)
+            update_dict = {key: value for key, value in movie_obj.to_dict().items() if key in supplied}
             update_dict['updated_at'] = datetime.utcnow()
             
-            result = self.collection.update_one(
-                {'_id': ObjectId(movie_id)},
-                {'$set': update_dict}
+            previous = self.collection.find_one_and_update(
+                self._id_filter(movie_id),
+                {'$set': update_dict},
+                return_document=ReturnDocument.BEFORE
             )
             
-            if result.matched_count:
+            if previous:
+                self.statistics_service.apply_change(old=previous, new={**previous, **update_dict})
+                # Vettore di similarità e indice dei suggerimenti solo se cambiano i loro campi
+                if supplied & SimilarityService.FEATURE_PROJECTION.keys():
+                    self.similarity_service.update_title({**previous, **update_dict})
+                if supplied & TypeaheadService.TITLE_PROJECTION.keys():
+                    self.typeahead_service.update_title({**previous, **update_dict})
+                self._invalidate_movie(movie_id)
                 return self.get_movie_by_id(movie_id)
             else:
                 return {'success': False, 'error': 'Film non trovato'}
@@ -157,65 +674,113 @@ class MovieService:
     def delete_movie(self, movie_id: str) -> Dict:
         """Elimina un film"""
         try:
-            if not ObjectId.is_valid(movie_id):
-                return {'success': False, 'error': 'ID non valido'}
-            
-            result = self.collection.delete_one({'_id': ObjectId(movie_id)})
+            deleted = self.collection.find_one_and_delete(self._id_filter(movie_id))
             
-            if result.deleted_count:
+            if deleted:
+                self.statistics_service.apply_change(old=deleted)
+                self.similarity_service.remove_title(deleted['_id'])
+                self.typeahead_service.remove_title(deleted['_id'])
+                self._invalidate_movie(movie_id)
                 return {'success': True, 'message': 'Film eliminato con successo'}
             else:
                 return {'success': False, 'error': 'Film non trovato'}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_statistics(self) -> Dict:
-        """Ottiene statistiche sui film"""
+    def autocomplete(self, query: str, limit: int = 8) -> Dict:
+        """Suggerimenti per la ricerca (titoli e persone) dall'indice in memoria"""
+        return self.typeahead_service.suggest(query, limit)
+    
+    def get_similar_movies(self, movie_id: str, limit: int = 10,
+                           fields: Optional[List[str]] = None) -> Dict:
+        """Titoli simili precalcolati, nell'ordine di similarità, con il punteggio.
+        Vengono letti solo i campi richiesti (per default quelli della scheda
+        compatta), senza i crediti"""
         try:
-            pipeline = [
-                {
-                    '$group': {
-                        '_id': None,
-                        'total_movies': {'$sum': 1},
-                        'avg_imdb_score': {'$avg': '$imdb_score'},
-                        'avg_runtime': {'$avg': '$runtime'},
-                        'total_shows': {
-                            '$sum': {'$cond': [{'$eq': ['$type', 'show']}, 1, 0]}
-                        },
-                        'total_movies_only': {
-                            '$sum': {'$cond': [{'$eq': ['$type', 'movie']}, 1, 0]}
-                        }
-                    }
-                }
-            ]
+            projection = self._listing_projection(fields or list(self.CARD_FIELDS))
+            neighbours = self.similarity_service.get_neighbours(movie_id, limit)
+            if neighbours is None:
+                return {'success': False, 'error': 'Titoli simili non disponibili per questo film'}
             
-            stats = list(self.collection.aggregate(pipeline))
-            if stats:
-                del stats[0]['_id']
-                return {'success': True, 'data': stats[0]}
-            else:
-                return {'success': True, 'data': {}}
+            scores = {str(neighbour['id']): neighbour['score'] for neighbour in neighbours}
+            movies_by_id = {}
+            for movie in self.collection.find(self._ids_filter(list(scores)), projection):
+                movie = to_public(movie)
+                movies_by_id[movie['id']] = movie
+            
+            similar = []
+            for neighbour_id, score in scores.items():
+                movie = movies_by_id.get(neighbour_id)
+                if movie is not None:
+                    movie['similarity'] = score
+                    similar.append(movie)
+            return {'success': True, 'data': similar}
         except Exception as e:
             return {'success': False, 'error': str(e)}
+    
+    def get_statistics(self) -> Dict:
+        """Ottiene statistiche sui film, passando dalla cache"""
+        version = self._cache_version()
+        cached = self._statistics_cache.get('statistics', version=version)
+        if cached is not None:
+            return {'success': True, 'data': dict(cached)}
         
-    def search_movies(self, query: str) -> Dict:
-        """Cerca film per titolo o descrizione"""
+        result = self._compute_statistics()
+        if result['success']:
+            self._statistics_cache.set('statistics', dict(result['data']), version=version)
+        return result
+    
+    def _compute_statistics(self) -> Dict:
+        try:
+            return {'success': True, 'data': self.statistics_service.get_summary()}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def _search_cursor(self, query: str, mode: str, projection: Dict):
+        """Costruisce il cursore di ricerca: full-text pesato o prefisso sul titolo"""
+        if mode == 'prefix':
+            return (self.collection.find({'title': {'$gte': query, '$lt': query + '\uffff'}},
+                                         projection)
+                    .collation(self.TITLE_COLLATION)
+                    .sort([('title', 1), ('_id', 1)]))
+        
+        return (self.collection.find(
+                    {'$text': {'$search': query}},
+                    {**projection, 'relevance': {'$meta': 'textScore'}})
+                .sort([('relevance', {'$meta': 'textScore'}), ('_id', 1)]))
+    
+    def search_movies(self, query: str, page: int = 1, per_page: int = 50,
+                      mode: str = 'text', fields: Optional[List[str]] = None) -> Dict:
+        """Cerca film per titolo o descrizione, ordinati per rilevanza.
+        In modalità 'prefix' cerca i titoli che iniziano con la query (typeahead);
+        se la ricerca full-text non trova nulla si ripiega sul prefisso del titolo"""
         try:
             if not query:
                 return {'success': False, 'error': 'Query di ricerca richiesta'}
+            if mode not in ('text', 'prefix'):
+                return {'success': False, 'error': 'Modalità di ricerca non valida'}
             
-            regex_query = {'$regex': query, '$options': 'i'}
-            movies = list(self.collection.find({
-                '$or': [
-                    {'title': regex_query},
-                    {'description': regex_query}
-                ]
-            }).sort('created_at', -1))
+            projection = self._listing_projection(fields)
+            skip = (page - 1) * per_page
+            limit = min(per_page, self.SEARCH_MAX_RESULTS - skip)
+            if limit <= 0:
+                return {
+                    'success': True,
+                    'data': [],
+                    'pagination': {'page': page, 'per_page': per_page, 'has_more': False}
+                }
             
-            for movie in movies:
-                movie['id'] = str(movie['_id'])
-                del movie['_id']
+            movies = list(self._search_cursor(query, mode, projection).skip(skip).limit(limit + 1))
+            if not movies and mode == 'text' and page == 1:
+                movies = list(self._search_cursor(query, 'prefix', projection).limit(limit + 1))
             
-            return {'success': True, 'data': movies}
+            has_more = len(movies) > limit and skip + limit < self.SEARCH_MAX_RESULTS
+            movies = movies[:limit]
+            
+            return {
+                'success': True,
+                'data': [to_public(movie) for movie in movies],
+                'pagination': {'page': page, 'per_page': per_page, 'has_more': has_more}
+            }
         except Exception as e:
-            return {'success': False, 'error': str(e)}
\ No newline at end of file
+            return {'success': False, 'error': str(e)}
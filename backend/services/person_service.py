@@ -0,0 +1,104 @@
+from database import Database
+from utils.json_codec import to_public
+from typing import Dict, List, Optional
+
+class PersonService:
+    """Attori e registi ricavati dalla collezione credits (una riga per
+    persona, film e ruolo); la persona è identificata da person_id"""
+    
+    NAME_COLLATION = {'locale': 'en', 'strength': 2}
+    ROLES = ('ACTOR', 'DIRECTOR')
+    FILM_PROJECTION = {'_id': 1, 'title': 1, 'type': 1, 'release_year': 1, 'genres': 1,
+                       'cover_url': 1, 'imdb_score': 1, 'tmdb_score': 1}
+    
+    def __init__(self):
+        self.db = Database()
+        self.collection = self.db.get_collection("credits")
+        self.movie_collection = self.db.get_collection("movie")
+        self._create_indexes()
+    
+    def _create_indexes(self):
+        """Crea gli indici per la ricerca per nome e la filmografia"""
+        try:
+            self.collection.create_index([("name", 1)], name='name_ci', collation=self.NAME_COLLATION)
+            self.collection.create_index([("person_id", 1), ("role", 1)])
+            self.collection.create_index([("film_id", 1)])
+        except Exception as e:
+            print(f"Errore nella creazione degli indici delle persone: {e}")
+    
+    def search_people(self, query: str, limit: int = 20, role: Optional[str] = None) -> Dict:
+        """Persone il cui nome inizia con query (senza distinzione di maiuscole),
+        ordinate per numero di titoli. Le righe sono lette dall'indice name_ci e
+        raggruppate per persona tutte quante: il limite si applica solo alle
+        persone, così il conteggio dei titoli è sempre completo"""
+        try:
+            query = query.strip()
+            if not query:
+                return {'success': False, 'error': 'Query di ricerca richiesta'}
+            if role is not None and role not in self.ROLES:
+                return {'success': False, 'error': 'Ruolo non valido'}
+            
+            match = {'name': {'$gte': query, '$lt': query + '\uffff'}}
+            if role:
+                match['role'] = role
+            
+            pipeline = [
+                {'$match': match},
+                {'$group': {
+                    '_id': '$person_id',
+                    'name': {'$first': '$name'},
+                    'roles': {'$addToSet': '$role'},
+                    'films': {'$addToSet': '$film_id'}
+                }},
+                {'$project': {'name': 1, 'roles': 1, 'film_count': {'$size': '$films'}}},
+                {'$sort': {'film_count': -1, 'name': 1}},
+                {'$limit': limit}
+            ]
+            
+            people = [{
+                'id': person['_id'],
+                'name': person['name'],
+                'roles': sorted(person['roles']),
+                'film_count': person['film_count']
+            } for person in self.collection.aggregate(pipeline, collation=self.NAME_COLLATION)]
+            
+            return {'success': True, 'data': people}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def get_filmography(self, person_id: int, role: Optional[str] = None,
+                        exclude: Optional[List[str]] = None) -> Dict:
+        """Titoli di una persona con ruolo e personaggio, dal più recente.
+        I film sono letti in blocco con un'unica query $in sull'_id"""
+        try:
+            if role is not None and role not in self.ROLES:
+                return {'success': False, 'error': 'Ruolo non valido'}
+            
+            match = {'person_id': person_id}
+            if role:
+                match['role'] = role
+            if exclude:
+                match['film_id'] = {'$nin': exclude}
+            
+            credits = list(self.collection.find(match, {'_id': 0, 'film_id': 1, 'name': 1,
+                                                        'role': 1, 'character': 1}))
+            if not credits:
+                return {'success': False, 'error': 'Persona non trovata'}
+            
+            roles_by_film = {}
+            for credit in credits:
+                roles_by_film.setdefault(credit['film_id'], []).append({
+                    'role': credit['role'],
+                    'character': credit.get('character', '')
+                })
+            
+            films = []
+            for film in self.movie_collection.find({'_id': {'$in': list(roles_by_film)}},
+                                                   self.FILM_PROJECTION):
+                film['roles'] = roles_by_film[film['_id']]
+                films.append(to_public(film))
+            films.sort(key=lambda film: (-(film.get('release_year') or 0), film['id']))
+            
+            return {'success': True, 'data': {'id': person_id, 'name': credits[0]['name'], 'films': films}}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
@@ -0,0 +1,290 @@
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from config import Config
+from database import Database
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+
+class CooccurrenceModel:
+    """Matrice item-item delle co-occorrenze nei preferiti degli utenti.
+    La base è una matrice CSR costruita da zero (diagonale = numero di utenti
+    che hanno il film tra i preferiti); le modifiche successive finiscono in
+    una sovrapposizione sparsa (dizionari) che viene consolidata nella base
+    quando supera una certa dimensione"""
+
+    def __init__(self, items: List[str], matrix):
+        self.items = list(items)
+        self.index = {movie_id: i for i, movie_id in enumerate(self.items)}
+        self.base = matrix.tocsr()
+        self.popularity = np.asarray(self.base.diagonal(), dtype=np.float64)
+        self.delta: Dict[int, Dict[int, float]] = {}
+        self.delta_size = 0
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_favorites(cls, favorites: Iterable[List[str]]) -> 'CooccurrenceModel':
+        """Costruisce la base da un iterabile di liste di preferiti (una per utente):
+        con U matrice binaria utenti x film, le co-occorrenze sono U^T U"""
+        index: Dict[str, int] = {}
+        rows, cols = [], []
+        users = 0
+        for movie_ids in favorites:
+            for movie_id in set(movie_ids):
+                rows.append(users)
+                cols.append(index.setdefault(movie_id, len(index)))
+            users += 1
+
+        user_items = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(users, len(index))
+        )
+        items = sorted(index, key=index.get)
+        return cls(items, (user_items.T @ user_items).tocsr())
+
+    def _column(self, movie_id: str) -> int:
+        """Indice del film, aggiunto in coda se mai visto prima"""
+        column = self.index.get(movie_id)
+        if column is None:
+            column = len(self.items)
+            self.items.append(movie_id)
+            self.index[movie_id] = column
+            self.popularity = np.append(self.popularity, 0.0)
+        return column
+
+    def apply(self, movie_id: str, others: Iterable[str], sign: int):
+        """Aggiunge (sign=1) o toglie (sign=-1) il film dai preferiti di un utente
+        che contiene anche gli altri film indicati"""
+        i = self._column(movie_id)
+        self.popularity[i] += sign
+        for other in others:
+            if other == movie_id:
+                continue
+            j = self._column(other)
+            for a, b in ((i, j), (j, i)):
+                row = self.delta.setdefault(a, {})
+                if b not in row:
+                    self.delta_size += 1
+                row[b] = row.get(b, 0.0) + sign
+        if self.delta_size > Config.RECOMMENDATION_MAX_DELTA:
+            self.compact()
+
+    def compact(self):
+        """Somma la sovrapposizione alla base"""
+        size = len(self.items)
+        rows, cols, values = [], [], []
+        for i, row in self.delta.items():
+            for j, value in row.items():
+                rows.append(i)
+                cols.append(j)
+                values.append(value)
+        base = self.base
+        if base.shape != (size, size):
+            base = sparse.csr_matrix((base.data, base.indices, base.indptr), shape=(base.shape[0], size))
+            base = sparse.vstack([base, sparse.csr_matrix((size - base.shape[0], size))]).tocsr()
+        delta = sparse.csr_matrix((np.array(values, dtype=np.float32), (rows, cols)), shape=(size, size))
+        merged = (base + delta).tocsr()
+        merged.setdiag(self.popularity)
+        merged.eliminate_zeros()
+        self.base = merged
+        self.delta = {}
+        self.delta_size = 0
+
+    def scores(self, favorites: List[str]):
+        """Punteggio di ogni film: somma delle similarità del coseno
+        c_ij / sqrt(pop_i * pop_j) rispetto ai film preferiti"""
+        size = len(self.items)
+        columns = list(dict.fromkeys(self.index[movie_id] for movie_id in favorites if movie_id in self.index))
+        result = np.zeros(size, dtype=np.float64)
+        if not columns:
+            return result, columns
+
+        with np.errstate(divide='ignore'):
+            inverse_root = np.where(self.popularity > 0, 1.0 / np.sqrt(self.popularity), 0.0)
+        weights = inverse_root[columns]
+
+        in_base = np.array(columns) < self.base.shape[0]
+        if in_base.any():
+            partial = sparse.csr_matrix(weights[in_base]) @ self.base[np.array(columns)[in_base]]
+            result[:partial.shape[1]] += partial.toarray().ravel()
+        for column, weight in zip(columns, weights):
+            for j, value in self.delta.get(column, {}).items():
+                result[j] += value * weight
+
+        result *= inverse_root
+        result[columns] = 0.0
+        return result, columns
+
+
+class RecommendationService:
+    """Raccomandazioni personalizzate dai preferiti (filtro collaborativo item-item).
+    Il modello è tenuto in memoria per processo: costruito alla prima richiesta,
+    aggiornato in modo incrementale a ogni aggiunta/rimozione di preferiti e
+    ricostruito in background dopo RECOMMENDATION_REBUILD_INTERVAL secondi, così
+    le modifiche servite da altri worker vengono recepite. Una sola costruzione
+    alla volta: le richieste concorrenti attendono la prima o usano il modello
+    precedente.
+    Ogni modifica ai preferiti incrementa favorites_version dell'utente: le
+    modifiche arrivate durante la scansione vengono riapplicate solo se più
+    recenti della versione letta dalla scansione, così nessuna è contata due volte"""
+
+    _lock = threading.Lock()
+    _build_lock = threading.Lock()
+    _model: Optional[CooccurrenceModel] = None
+    _building = False
+    _journal: List[tuple] = []
+
+    def __init__(self):
+        self.db = Database()
+        self.user_collection = self.db.get_collection("user")
+
+    @staticmethod
+    def available() -> bool:
+        """NumPy e SciPy sono dipendenze opzionali"""
+        return np is not None
+
+    def _favorites(self, seen: Dict):
+        """Preferiti di ogni utente; seen riceve la versione letta per ciascuno.
+        Vengono letti anche gli utenti senza preferiti: la loro versione serve
+        a riconoscere le modifiche già comprese nella scansione"""
+        cursor = self.user_collection.find({}, {'favorite_movies': 1, 'favorites_version': 1})
+        for user in cursor.batch_size(5000):
+            seen[user['_id']] = user.get('favorites_version', 0)
+            yield user.get('favorite_movies') or []
+
+    def build(self) -> CooccurrenceModel:
+        """Ricostruisce la matrice, attendendo l'eventuale costruzione in corso"""
+        with self._build_lock:
+            return self._build()
+
+    def _build(self) -> CooccurrenceModel:
+        # Da chiamare con _build_lock acquisito. Le modifiche arrivate durante la
+        # scansione vengono registrate nel giornale (il giornale appartiene solo
+        # a questa costruzione) e riapplicate sul nuovo modello se la scansione
+        # ha letto una versione precedente dell'utente
+        with self._lock:
+            RecommendationService._building = True
+            RecommendationService._journal = []
+        seen = {}
+        try:
+            model = CooccurrenceModel.from_favorites(self._favorites(seen))
+        except Exception:
+            with self._lock:
+                RecommendationService._building = False
+                RecommendationService._journal = []
+            raise
+
+        with self._lock:
+            journal = RecommendationService._journal
+            # Utenti eliminati prima di essere letti: la scansione non li contiene
+            gone = {user_id for user_id, _, _, deleted in journal if deleted and user_id not in seen}
+            for user_id, version, events, _ in journal:
+                if user_id in gone or version <= seen.get(user_id, 0):
+                    continue
+                for movie_id, others, sign in events:
+                    model.apply(movie_id, others, sign)
+            RecommendationService._model = model
+            RecommendationService._building = False
+            RecommendationService._journal = []
+        return model
+
+    def _rebuild_in_background(self):
+        if not self._build_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self._build()
+            except Exception as e:
+                print(f"Errore nella ricostruzione delle raccomandazioni: {e}")
+            finally:
+                self._build_lock.release()
+
+        threading.Thread(target=run, name='recommendations-rebuild', daemon=True).start()
+
+    def _current_model(self) -> CooccurrenceModel:
+        model = RecommendationService._model
+        if model is None:
+            with self._build_lock:
+                # Un'altra richiesta potrebbe averlo costruito nel frattempo
+                model = RecommendationService._model
+                if model is None:
+                    model = self._build()
+        elif time.monotonic() - model.built_at > Config.RECOMMENDATION_REBUILD_INTERVAL:
+            # Nel frattempo si continua a rispondere con il modello precedente
+            self._rebuild_in_background()
+        return model
+
+    def record_change(self, user_id, version: int, added: Dict[str, List[str]] = None,
+                      removed: Dict[str, List[str]] = None, deleted: bool = False):
+        """Aggiorna le co-occorrenze dopo una modifica ai preferiti di un utente.
+        added/removed: film -> altri film presenti nei preferiti dell'utente;
+        version: favorites_version dell'utente dopo la modifica;
+        deleted: la modifica è l'eliminazione dell'utente"""
+        if not self.available():
+            return
+        try:
+            with self._lock:
+                events = [(movie_id, others, 1) for movie_id, others in (added or {}).items()]
+                events += [(movie_id, others, -1) for movie_id, others in (removed or {}).items()]
+                if RecommendationService._building:
+                    RecommendationService._journal.append((user_id, version, events, deleted))
+                model = RecommendationService._model
+                if model is None:
+                    return
+                for movie_id, others, sign in events:
+                    model.apply(movie_id, others, sign)
+        except Exception as e:
+            print(f"Errore nell'aggiornamento delle raccomandazioni: {e}")
+
+    def record_favorites_update(self, user_id, version: int, before: List[str], after: List[str],
+                                deleted: bool = False):
+        """Registra il passaggio dai preferiti before a after (anche per più film).
+        Rimozioni calcolate rispetto alla lista precedente, aggiunte rispetto a
+        quella successiva, così ogni coppia viene contata una sola volta"""
+        before_set, after_set = set(before), set(after)
+        removed_ids = [movie_id for movie_id in before if movie_id not in after_set]
+        added_ids = [movie_id for movie_id in after if movie_id not in before_set]
+
+        removed, remaining = {}, list(before)
+        for movie_id in removed_ids:
+            remaining.remove(movie_id)
+            removed[movie_id] = list(remaining)
+        added, current = {}, list(remaining)
+        for movie_id in added_ids:
+            added[movie_id] = list(current)
+            current.append(movie_id)
+
+        if added or removed:
+            self.record_change(user_id, version, added=added, removed=removed, deleted=deleted)
+
+    def recommend(self, favorites: List[str], limit: int = 20) -> Dict:
+        """Film consigliati per un utente con i preferiti indicati, esclusi i preferiti"""
+        try:
+            if not self.available():
+                return {'success': False, 'error': 'Raccomandazioni non disponibili: installare numpy e scipy'}
+            if not favorites:
+                return {'success': True, 'data': []}
+
+            model = self._current_model()
+            with self._lock:
+                scores, _ = model.scores(favorites)
+                items = list(model.items)
+
+            candidates = np.flatnonzero(scores > 0)
+            if candidates.size > limit:
+                candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+            return {'success': True, 'data': [
+                {'id': items[i], 'score': round(float(scores[i]), 4)} for i in candidates
+            ]}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
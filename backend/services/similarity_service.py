@@ -0,0 +1,461 @@
+import math
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+from config import Config
+from database import Database
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+_TOKEN_RE = re.compile(r"[a-zà-öø-ÿ]{3,}")
+
+
+class FeatureVectorizer:
+    """Trasforma i film in vettori di feature sparsi: generi, paesi e tipo
+    in one-hot, anno e punteggi standardizzati e, opzionalmente, TF-IDF
+    della descrizione. Ogni blocco ha un peso; le righe finali hanno norma 1
+    così che il prodotto scalare sia la similarità del coseno.
+    Il vocabolario è serializzabile per riusarlo negli aggiornamenti incrementali"""
+
+    WEIGHTS = {'genres': 1.0, 'countries': 0.5, 'type': 0.5, 'numeric': 0.5, 'description': 1.0}
+    NUMERIC_FIELDS = ('release_year', 'imdb_score', 'tmdb_score')
+    MAX_TERMS = 20000
+
+    def __init__(self, genres=None, countries=None, types=None, numeric=None,
+                 terms=None, idf=None):
+        self.genres = genres or []
+        self.countries = countries or []
+        self.types = types or []
+        self.numeric = numeric or {}
+        self.terms = terms or []
+        self.idf = idf or []
+        self._build_offsets()
+
+    def _build_offsets(self):
+        self.genre_index = {g: i for i, g in enumerate(self.genres)}
+        self.country_index = {c: i for i, c in enumerate(self.countries)}
+        self.type_index = {t: i for i, t in enumerate(self.types)}
+        self.term_index = {t: i for i, t in enumerate(self.terms)}
+        self.offsets = {}
+        offset = 0
+        for block, size in (('genres', len(self.genres)), ('countries', len(self.countries)),
+                            ('type', len(self.types)), ('numeric', len(self.NUMERIC_FIELDS)),
+                            ('description', len(self.terms))):
+            self.offsets[block] = offset
+            offset += size
+        self.dimensions = offset
+
+    @staticmethod
+    def _tokens(text: Optional[str]) -> List[str]:
+        return _TOKEN_RE.findall((text or '').lower())
+
+    @staticmethod
+    def _type(movie: Dict) -> str:
+        return str(movie.get('type') or '').lower()
+
+    def fit(self, movies: List[Dict], descriptions: bool = False) -> 'FeatureVectorizer':
+        self.genres = sorted({g.lower() for m in movies for g in m.get('genres') or []})
+        self.countries = sorted({c.upper() for m in movies for c in m.get('production_countries') or []})
+        self.types = sorted({self._type(m) for m in movies if m.get('type')})
+
+        self.numeric = {}
+        for field in self.NUMERIC_FIELDS:
+            values = np.array([m[field] for m in movies if isinstance(m.get(field), (int, float))],
+                              dtype=np.float64)
+            if values.size:
+                self.numeric[field] = [float(values.mean()), float(values.std()) or 1.0]
+
+        self.terms, self.idf = [], []
+        if descriptions:
+            document_frequency = Counter()
+            for movie in movies:
+                document_frequency.update(set(self._tokens(movie.get('description'))))
+            total = len(movies)
+            # Termini troppo rari o troppo comuni non aiutano a distinguere i titoli
+            candidates = [(term, df) for term, df in document_frequency.items()
+                          if df >= 2 and df <= total * 0.5]
+            candidates.sort(key=lambda item: (-item[1], item[0]))
+            candidates = candidates[:self.MAX_TERMS]
+            self.terms = [term for term, _ in candidates]
+            self.idf = [math.log((1 + total) / (1 + df)) + 1 for _, df in candidates]
+
+        self._build_offsets()
+        return self
+
+    def _block(self, rows, cols, values, row, columns, weight):
+        """Aggiunge un blocco alla riga con norma pari al suo peso"""
+        if not columns:
+            return
+        norm = math.sqrt(sum(v * v for _, v in columns)) or 1.0
+        for col, value in columns:
+            rows.append(row)
+            cols.append(col)
+            values.append(weight * value / norm)
+
+    def transform(self, movies: List[Dict]):
+        """Matrice CSR (film x feature) con righe normalizzate"""
+        rows, cols, values = [], [], []
+        for row, movie in enumerate(movies):
+            genres = {self.genre_index[g.lower()] for g in movie.get('genres') or [] if g.lower() in self.genre_index}
+            self._block(rows, cols, values, row,
+                        [(self.offsets['genres'] + i, 1.0) for i in sorted(genres)], self.WEIGHTS['genres'])
+
+            countries = {self.country_index[c.upper()] for c in movie.get('production_countries') or []
+                         if c.upper() in self.country_index}
+            self._block(rows, cols, values, row,
+                        [(self.offsets['countries'] + i, 1.0) for i in sorted(countries)], self.WEIGHTS['countries'])
+
+            if self._type(movie) in self.type_index:
+                self._block(rows, cols, values, row,
+                            [(self.offsets['type'] + self.type_index[self._type(movie)], 1.0)], self.WEIGHTS['type'])
+
+            # Valori standardizzati e limitati a [-1, 1]: il blocco pesa al più WEIGHTS['numeric']
+            numeric = []
+            for i, field in enumerate(self.NUMERIC_FIELDS):
+                value = movie.get(field)
+                if field in self.numeric and isinstance(value, (int, float)):
+                    mean, std = self.numeric[field]
+                    numeric.append((self.offsets['numeric'] + i, max(-3.0, min(3.0, (value - mean) / std)) / 3))
+            for col, value in numeric:
+                rows.append(row)
+                cols.append(col)
+                values.append(self.WEIGHTS['numeric'] * value / math.sqrt(len(self.NUMERIC_FIELDS)))
+
+            if self.terms:
+                counts = Counter(t for t in self._tokens(movie.get('description')) if t in self.term_index)
+                self._block(rows, cols, values, row,
+                            [(self.offsets['description'] + self.term_index[t], (1 + math.log(n)) * self.idf[self.term_index[t]])
+                             for t, n in counts.items()],
+                            self.WEIGHTS['description'])
+
+        matrix = sparse.csr_matrix((np.array(values, dtype=np.float32), (rows, cols)),
+                                   shape=(len(movies), self.dimensions), dtype=np.float32)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+    def to_dict(self) -> Dict:
+        return {'genres': self.genres, 'countries': self.countries, 'types': self.types,
+                'numeric': self.numeric, 'terms': self.terms, 'idf': self.idf}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FeatureVectorizer':
+        return cls(data.get('genres'), data.get('countries'), data.get('types'),
+                   data.get('numeric'), data.get('terms'), data.get('idf'))
+
+
+class SimilarityService:
+    """Titoli simili per contenuto. La costruzione offline calcola i primi K
+    vicini di ogni film e li salva nella collezione movie_similar, così la
+    richiesta è una semplice lettura. Creazioni e modifiche aggiornano solo
+    il titolo coinvolto e le liste dei vicini in cui entra o da cui esce,
+    usando una copia in memoria delle feature: la matrice caricata resta
+    immutata (le righe superate vengono azzerate sul posto) e le righe
+    aggiornate finiscono in una piccola matrice di aggiunte. La copia è
+    ricaricata in background dopo SIMILAR_MODEL_TTL"""
+
+    MODEL_ID = 'model'
+    FEATURE_PROJECTION = {'genres': 1, 'production_countries': 1, 'type': 1, 'release_year': 1,
+                          'imdb_score': 1, 'tmdb_score': 1, 'description': 1}
+    # Quanti titoli candidati ricevono il nuovo film nella propria lista di vicini
+    CANDIDATE_FACTOR = 5
+
+    _lock = threading.Lock()
+    _reloading = threading.Lock()
+    _state = None
+    # Modifiche arrivate durante un ricaricamento, riapplicate al nuovo stato
+    _journal: Optional[List[tuple]] = None
+
+    def __init__(self):
+        self.db = Database()
+        self.collection = self.db.get_collection("movie_similar")
+        self.model_collection = self.db.get_collection("movie_similar_model")
+        self.movie_collection = self.db.get_collection("movie")
+
+    @staticmethod
+    def available() -> bool:
+        """NumPy e SciPy sono dipendenze opzionali"""
+        return np is not None
+
+    def get_neighbours(self, movie_id: str, limit: int) -> Optional[List[Dict]]:
+        """Vicini precalcolati del film ([{id, score}]), None se non ancora calcolati"""
+        document = self.collection.find_one({'_id': str(movie_id)},
+                                            {'neighbours': {'$slice': limit}})
+        if document is None:
+            return None
+        return document['neighbours']
+
+    @staticmethod
+    def _select(scores, top_k: int) -> List[List[tuple]]:
+        """Per ogni riga di scores i primi top_k (indice, score) positivi"""
+        k = min(top_k, scores.shape[1] - 1)
+        if k <= 0:
+            return [[] for _ in range(scores.shape[0])]
+
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        result = []
+        for i, candidates in enumerate(best):
+            ordered = candidates[np.argsort(-scores[i, candidates], kind='stable')]
+            result.append([(int(j), float(scores[i, j])) for j in ordered if scores[i, j] > 0])
+        return result
+
+    def _top_k(self, matrix, rows, top_k: int, exclude) -> List[List[tuple]]:
+        """Primi K vicini (indice, score) per le righe indicate; exclude[i] è la
+        riga da escludere per rows[i] (il film stesso)"""
+        scores = (matrix[rows] @ matrix.T).toarray()
+        scores[np.arange(len(rows)), exclude] = -np.inf
+        return self._select(scores, top_k)
+
+    def build(self, top_k: int = None, descriptions: bool = None, batch_size: int = None) -> Dict:
+        """Ricostruisce da zero feature e vicini di tutti i titoli"""
+        if not self.available():
+            raise RuntimeError('NumPy e SciPy sono necessari per calcolare i titoli simili')
+        top_k = top_k or Config.SIMILAR_TOP_K
+        descriptions = Config.SIMILAR_USE_DESCRIPTIONS if descriptions is None else descriptions
+        batch_size = batch_size or Config.SIMILAR_BATCH_SIZE
+
+        start = time.perf_counter()
+        movies = list(self.movie_collection.find({}, self.FEATURE_PROJECTION))
+        ids = [str(movie['_id']) for movie in movies]
+        vectorizer = FeatureVectorizer().fit(movies, descriptions=descriptions)
+        matrix = vectorizer.transform(movies)
+
+        build_id = datetime.utcnow()
+        written = 0
+        for first in range(0, len(ids), batch_size):
+            rows = np.arange(first, min(first + batch_size, len(ids)))
+            neighbours = self._top_k(matrix, rows, top_k, rows)
+            operations = [
+                ReplaceOne({'_id': ids[row]}, {
+                    'neighbours': [{'id': ids[j], 'score': round(score, 4)} for j, score in found],
+                    'built_at': build_id
+                }, upsert=True)
+                for row, found in zip(rows, neighbours)
+            ]
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+                written += len(operations)
+
+        # Titoli eliminati dopo la costruzione precedente
+        self.collection.delete_many({'built_at': {'$ne': build_id}})
+        self.collection.create_index([('neighbours.id', 1)])
+        self.model_collection.replace_one({'_id': self.MODEL_ID}, {
+            'vectorizer': vectorizer.to_dict(),
+            'top_k': top_k,
+            'built_at': build_id
+        }, upsert=True)
+
+        with self._lock:
+            SimilarityService._state = self._make_state(vectorizer, matrix, ids, top_k)
+
+        return {
+            'titles': written,
+            'features': vectorizer.dimensions,
+            'seconds': round(time.perf_counter() - start, 2)
+        }
+
+    @staticmethod
+    def _make_state(vectorizer, matrix, ids, top_k: int = None):
+        ids = [str(movie_id) for movie_id in ids]
+        matrix = matrix.tocsr()
+        return {
+            'vectorizer': vectorizer,
+            'matrix': matrix,
+            # Righe dei film creati o modificati dopo il caricamento
+            'patch': sparse.csr_matrix((0, matrix.shape[1]), dtype=matrix.dtype),
+            'ids': ids,
+            'index': {movie_id: row for row, movie_id in enumerate(ids)},
+            'top_k': top_k or Config.SIMILAR_TOP_K,
+            'loaded_at': time.monotonic()
+        }
+
+    def _read_state(self):
+        """Vocabolario salvato dalla costruzione offline e matrice ricalcolata
+        dai film correnti (scansione completa, da eseguire fuori dal lock)"""
+        model = self.model_collection.find_one({'_id': self.MODEL_ID})
+        if model is None:
+            return None
+        vectorizer = FeatureVectorizer.from_dict(model['vectorizer'])
+        movies = list(self.movie_collection.find({}, self.FEATURE_PROJECTION))
+        return self._make_state(vectorizer, vectorizer.transform(movies),
+                                [movie['_id'] for movie in movies], model.get('top_k'))
+
+    def _reload_state(self):
+        # Da chiamare con _reloading acquisito
+        state = None
+        with self._lock:
+            SimilarityService._journal = []
+        try:
+            state = self._read_state()
+        finally:
+            with self._lock:
+                journal, SimilarityService._journal = SimilarityService._journal, None
+                if state is not None:
+                    for action, payload in journal:
+                        if action == 'update':
+                            self._set_row(state, str(payload.get('_id', payload.get('id'))),
+                                          state['vectorizer'].transform([payload]))
+                        else:
+                            self._clear_row(state, payload)
+                    SimilarityService._state = state
+        return state
+
+    def _reload_in_background(self):
+        if not self._reloading.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self._reload_state()
+            except Exception as e:
+                print(f"Errore nel ricaricamento del modello dei titoli simili: {e}")
+            finally:
+                self._reloading.release()
+
+        threading.Thread(target=run, name='similarity-reload', daemon=True).start()
+
+    def _current_state(self):
+        """Modello in memoria: caricato alla prima modifica (una sola volta),
+        poi ricaricato in background quando scade"""
+        state = SimilarityService._state
+        if state is None:
+            with self._reloading:
+                state = SimilarityService._state
+                if state is None:
+                    state = self._reload_state()
+        elif time.monotonic() - state['loaded_at'] >= Config.SIMILAR_MODEL_TTL:
+            # Nel frattempo si continua con lo stato precedente
+            self._reload_in_background()
+        return state
+
+    @staticmethod
+    def _zero_row(state, row: int):
+        """Azzera una riga sul posto, senza ricostruire la matrice"""
+        matrix, offset = state['matrix'], 0
+        if row >= matrix.shape[0]:
+            matrix, offset = state['patch'], matrix.shape[0]
+        row -= offset
+        matrix.data[matrix.indptr[row]:matrix.indptr[row + 1]] = 0
+
+    def _set_row(self, state, movie_id: str, vector) -> int:
+        """Nuovo vettore del film: la riga precedente viene azzerata e quella
+        nuova aggiunta in coda alle aggiunte. Da chiamare con _lock acquisito"""
+        row = state['index'].get(movie_id)
+        if row is not None:
+            self._zero_row(state, row)
+        state['patch'] = sparse.vstack([state['patch'], vector], format='csr')
+        row = len(state['ids'])
+        state['ids'].append(movie_id)
+        state['index'][movie_id] = row
+        return row
+
+    def _clear_row(self, state, movie_id: str):
+        row = state['index'].pop(movie_id, None)
+        if row is not None:
+            # La riga resta ma a zero: non comparirà più tra i vicini
+            self._zero_row(state, row)
+
+    def _neighbours_of(self, state, rows: List[int], top_k: int) -> List[List[tuple]]:
+        """Primi top_k vicini (id, score) delle righe indicate, su matrice e aggiunte"""
+        base, patch = state['matrix'], state['patch']
+        vectors = sparse.vstack([base[row] if row < base.shape[0] else patch[row - base.shape[0]]
+                                 for row in rows], format='csr')
+        scores = np.hstack([(vectors @ base.T).toarray(), (vectors @ patch.T).toarray()])
+        scores[np.arange(len(rows)), rows] = -np.inf
+        return [[(state['ids'][j], score) for j, score in found] for found in self._select(scores, top_k)]
+
+    def _affected(self, movie_id: str) -> List[str]:
+        """Titoli che hanno il film nella propria lista di vicini"""
+        return [document['_id'] for document in
+                self.collection.find({'neighbours.id': movie_id}, {'_id': 1})]
+
+    def _refill_operations(self, state, movie_ids: List[str]) -> List[ReplaceOne]:
+        """Liste di vicini ricalcolate per intero (con _lock acquisito)"""
+        rows = [state['index'][movie_id] for movie_id in movie_ids if movie_id in state['index']]
+        if not rows:
+            return []
+        now = datetime.utcnow()
+        return [
+            ReplaceOne({'_id': state['ids'][row]}, {
+                'neighbours': [{'id': j, 'score': round(score, 4)} for j, score in found],
+                'built_at': now
+            }, upsert=True)
+            for row, found in zip(rows, self._neighbours_of(state, rows, state['top_k']))
+        ]
+
+    def update_title(self, movie: Dict):
+        """Aggiorna i vicini di un film creato o modificato, lo inserisce nelle
+        liste dei titoli a cui è più simile e ricalcola quelle che lo
+        contenevano. Senza un modello costruito offline non fa nulla"""
+        if not self.available():
+            return
+        try:
+            if self._current_state() is None:
+                return
+            movie_id = str(movie.get('_id', movie.get('id')))
+            affected = set(self._affected(movie_id)) - {movie_id}
+
+            with self._lock:
+                if SimilarityService._journal is not None:
+                    SimilarityService._journal.append(('update', movie))
+                state = SimilarityService._state
+                top_k = state['top_k']
+                row = self._set_row(state, movie_id, state['vectorizer'].transform([movie]))
+                found = self._neighbours_of(state, [row], top_k * self.CANDIDATE_FACTOR)[0]
+                # Le liste che lo contenevano vengono ricalcolate: lo tengono con il
+                # nuovo punteggio oppure lo sostituiscono con il titolo successivo
+                operations = self._refill_operations(state, sorted(affected))
+
+            operations.append(ReplaceOne({'_id': movie_id}, {
+                'neighbours': [{'id': j, 'score': round(score, 4)} for j, score in found[:top_k]],
+                'built_at': datetime.utcnow()
+            }, upsert=True))
+            # Negli altri candidati $push con $sort/$slice lo tiene solo dove rientra nei primi K
+            operations += [
+                UpdateOne({'_id': j}, {'$push': {'neighbours': {
+                    '$each': [{'id': movie_id, 'score': round(score, 4)}],
+                    '$sort': {'score': -1},
+                    '$slice': top_k
+                }}})
+                for j, score in found if j not in affected
+            ]
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"Errore nell'aggiornamento dei titoli simili: {e}")
+
+    def remove_title(self, movie_id: str):
+        """Rimuove un film eliminato dai vicini e dal modello in memoria;
+        le liste che lo contenevano vengono ricalcolate"""
+        movie_id = str(movie_id)
+        try:
+            if self.available():
+                self._current_state()
+            affected = sorted(set(self._affected(movie_id)) - {movie_id})
+            self.collection.delete_one({'_id': movie_id})
+            operations = []
+            with self._lock:
+                if SimilarityService._journal is not None:
+                    SimilarityService._journal.append(('remove', movie_id))
+                state = SimilarityService._state
+                if state is not None:
+                    self._clear_row(state, movie_id)
+                    operations = self._refill_operations(state, affected)
+
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+            # Titoli non presenti nel modello in memoria: basta togliere il film
+            self.collection.update_many({'neighbours.id': movie_id},
+                                        {'$pull': {'neighbours': {'id': movie_id}}})
+        except Exception as e:
+            print(f"Errore nella rimozione dei titoli simili: {e}")
@@ -0,0 +1,159 @@
+from database import Database
+from config import Config
+from typing import Dict, Optional
+from datetime import datetime, timedelta
+
+class StatisticsService:
+    """Statistiche del catalogo materializzate in un documento di riepilogo,
+    aggiornato in modo incrementale a ogni scrittura e ricalcolato periodicamente"""
+    
+    SUMMARY_ID = 'catalog'
+    
+    def __init__(self):
+        self.db = Database()
+        self.collection = self.db.get_collection("statistics")
+        self.movie_collection = self.db.get_collection("movie")
+    
+    @staticmethod
+    def _key(value) -> str:
+        """Chiave utilizzabile come nome di campo MongoDB"""
+        return str(value).replace('.', '_').replace('$', '_')
+    
+    @staticmethod
+    def _is_number(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    
+    def _contribution(self, movie: Dict) -> Dict:
+        """Incrementi che un film apporta al riepilogo"""
+        inc = {'total': 1}
+        
+        movie_type = str(movie.get('type') or '').lower()
+        if movie_type:
+            inc[f'by_type.{self._key(movie_type)}'] = 1
+        if self._is_number(movie.get('imdb_score')):
+            inc['imdb_score_sum'] = movie['imdb_score']
+            inc['imdb_score_count'] = 1
+        if self._is_number(movie.get('runtime')):
+            inc['runtime_sum'] = movie['runtime']
+            inc['runtime_count'] = 1
+        if self._is_number(movie.get('release_year')):
+            inc[f'by_year.{movie["release_year"]}'] = 1
+        for genre in set(movie.get('genres') or []):
+            inc[f'by_genre.{self._key(genre)}'] = 1
+        for country in set(movie.get('production_countries') or []):
+            inc[f'by_country.{self._key(country)}'] = 1
+        
+        return inc
+    
+    def apply_change(self, old: Optional[Dict] = None, new: Optional[Dict] = None):
+        """Aggiorna il riepilogo sottraendo il contributo della versione precedente
+        del film e sommando quello della nuova. Se il riepilogo non esiste ancora
+        non fa nulla: verrà creato dal primo ricalcolo completo"""
+        try:
+            inc = {}
+            if new:
+                for key, value in self._contribution(new).items():
+                    inc[key] = inc.get(key, 0) + value
+            if old:
+                for key, value in self._contribution(old).items():
+                    inc[key] = inc.get(key, 0) - value
+            inc = {key: value for key, value in inc.items() if value != 0}
+            if not inc:
+                return
+            
+            self.collection.update_one(
+                {'_id': self.SUMMARY_ID},
+                {'$inc': inc, '$set': {'updated_at': datetime.utcnow()}}
+            )
+        except Exception as e:
+            print(f"Errore nell'aggiornamento delle statistiche: {e}")
+    
+    def recompute(self) -> Dict:
+        """Ricalcola da zero il riepilogo con un'unica aggregazione"""
+        def count_by(field, unwind=False):
+            stages = []
+            if unwind:
+                stages.append({'$project': {field: {'$setUnion': [{'$ifNull': [f'${field}', []]}]}}})
+                stages.append({'$unwind': f'${field}'})
+            else:
+                stages.append({'$match': {field: {'$type': 'number'}}})
+            stages.append({'$group': {'_id': f'${field}', 'count': {'$sum': 1}}})
+            return stages
+        
+        pipeline = [
+            {
+                '$facet': {
+                    'totals': [
+                        {
+                            '$group': {
+                                '_id': None,
+                                'total': {'$sum': 1},
+                                'imdb_score_sum': {'$sum': '$imdb_score'},
+                                'imdb_score_count': {
+                                    '$sum': {'$cond': [{'$isNumber': '$imdb_score'}, 1, 0]}
+                                },
+                                'runtime_sum': {'$sum': '$runtime'},
+                                'runtime_count': {
+                                    '$sum': {'$cond': [{'$isNumber': '$runtime'}, 1, 0]}
+                                }
+                            }
+                        }
+                    ],
+                    'by_type': [
+                        {'$group': {'_id': {'$toLower': {'$ifNull': ['$type', '']}}, 'count': {'$sum': 1}}}
+                    ],
+                    'by_year': count_by('release_year'),
+                    'by_genre': count_by('genres', unwind=True),
+                    'by_country': count_by('production_countries', unwind=True)
+                }
+            }
+        ]
+        
+        result = list(self.movie_collection.aggregate(pipeline))[0]
+        totals = result['totals'][0] if result['totals'] else {}
+        now = datetime.utcnow()
+        
+        summary = {
+            '_id': self.SUMMARY_ID,
+            'total': totals.get('total', 0),
+            'imdb_score_sum': totals.get('imdb_score_sum', 0),
+            'imdb_score_count': totals.get('imdb_score_count', 0),
+            'runtime_sum': totals.get('runtime_sum', 0),
+            'runtime_count': totals.get('runtime_count', 0),
+            'by_type': {self._key(row['_id']): row['count'] for row in result['by_type'] if row['_id']},
+            'by_year': {str(row['_id']): row['count'] for row in result['by_year']},
+            'by_genre': {self._key(row['_id']): row['count'] for row in result['by_genre']},
+            'by_country': {self._key(row['_id']): row['count'] for row in result['by_country']},
+            'computed_at': now,
+            'updated_at': now
+        }
+        
+        self.collection.replace_one({'_id': self.SUMMARY_ID}, summary, upsert=True)
+        return summary
+    
+    def get_summary(self) -> Dict:
+        """Legge il riepilogo (un solo find_one); lo ricalcola se manca o se è
+        più vecchio di STATISTICS_RECOMPUTE_INTERVAL per correggere eventuali derive"""
+        summary = self.collection.find_one({'_id': self.SUMMARY_ID})
+        max_age = timedelta(seconds=Config.STATISTICS_RECOMPUTE_INTERVAL)
+        if summary is None or summary.get('computed_at', datetime.min) < datetime.utcnow() - max_age:
+            summary = self.recompute()
+        
+        def average(total, count):
+            return total / count if count else None
+        
+        def positive(counts):
+            return {key: value for key, value in (counts or {}).items() if value > 0}
+        
+        by_type = summary.get('by_type', {})
+        return {
+            'total_movies': summary.get('total', 0),
+            'avg_imdb_score': average(summary.get('imdb_score_sum', 0), summary.get('imdb_score_count', 0)),
+            'avg_runtime': average(summary.get('runtime_sum', 0), summary.get('runtime_count', 0)),
+            'total_shows': by_type.get('show', 0),
+            'total_movies_only': by_type.get('movie', 0),
+            'by_genre': positive(summary.get('by_genre')),
+            'by_year': positive(summary.get('by_year')),
+            'by_country': positive(summary.get('by_country')),
+            'computed_at': summary.get('computed_at')
+        }
@@ -0,0 +1,106 @@
+import threading
+import time
+from typing import Dict
+
+from config import Config
+from database import Database
+from utils.prefix_index import PrefixIndex
+
+
+class TypeaheadService:
+    """Suggerimenti per la casella di ricerca: titoli (per popolarità TMDB)
+    e persone (per numero di titoli) da indici per prefisso in memoria.
+    Gli indici sono costruiti all'avvio, aggiornati dalle scritture sui film
+    servite da questo processo e ricostruiti in background ogni
+    TYPEAHEAD_REBUILD_INTERVAL secondi per recepire quelle degli altri worker"""
+
+    TITLE_PROJECTION = {'title': 1, 'tmdb_popularity': 1, 'release_year': 1, 'type': 1}
+
+    _titles = PrefixIndex()
+    _people = PrefixIndex()
+    _built_at = None
+    _rebuilding = threading.Lock()
+
+    def __init__(self):
+        self.db = Database()
+        self.movie_collection = self.db.get_collection("movie")
+        self.credits_collection = self.db.get_collection("credits")
+
+    @staticmethod
+    def _title_entry(movie: Dict):
+        movie_id = str(movie.get('_id', movie.get('id')))
+        return movie_id, movie.get('title'), movie.get('tmdb_popularity'), {
+            'id': movie_id,
+            'title': movie.get('title'),
+            'release_year': movie.get('release_year'),
+            'type': movie.get('type')
+        }
+
+    def build(self) -> Dict:
+        """Ricostruisce entrambi gli indici dal database"""
+        start = time.perf_counter()
+        self._titles.load(
+            self._title_entry(movie)
+            for movie in self.movie_collection.find({'title': {'$type': 'string'}}, self.TITLE_PROJECTION)
+        )
+        people = self.credits_collection.aggregate([
+            {'$match': {'person_id': {'$exists': True}}},
+            {'$group': {'_id': '$person_id', 'name': {'$first': '$name'}, 'films': {'$addToSet': '$film_id'}}},
+            {'$project': {'name': 1, 'film_count': {'$size': '$films'}}}
+        ], allowDiskUse=True)
+        self._people.load(
+            (person['_id'], person['name'], person['film_count'],
+             {'id': person['_id'], 'name': person['name'], 'film_count': person['film_count']})
+            for person in people
+        )
+        TypeaheadService._built_at = time.monotonic()
+        return {
+            'titles': len(self._titles),
+            'people': len(self._people),
+            'seconds': round(time.perf_counter() - start, 2)
+        }
+
+    def _rebuild_in_background(self):
+        if not self._rebuilding.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                print(f"Errore nella ricostruzione dei suggerimenti: {e}")
+            finally:
+                self._rebuilding.release()
+
+        threading.Thread(target=run, name='typeahead-rebuild', daemon=True).start()
+
+    def suggest(self, query: str, limit: int = 8) -> Dict:
+        """Titoli e persone il cui nome ha una parola che inizia per query"""
+        try:
+            built_at = TypeaheadService._built_at
+            if built_at is None or time.monotonic() - built_at > Config.TYPEAHEAD_REBUILD_INTERVAL:
+                if built_at is None:
+                    self.build()
+                else:
+                    # Nel frattempo si continua a rispondere con l'indice precedente
+                    self._rebuild_in_background()
+
+            return {'success': True, 'data': {
+                'titles': self._titles.search(query, limit),
+                'people': self._people.search(query, limit)
+            }}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def update_title(self, movie: Dict):
+        """Inserisce o aggiorna un titolo dopo una creazione o modifica"""
+        if TypeaheadService._built_at is None:
+            return
+        movie_id, title, popularity, payload = self._title_entry(movie)
+        if title:
+            self._titles.add(movie_id, title, popularity, payload)
+        else:
+            self._titles.remove(movie_id)
+
+    def remove_title(self, movie_id):
+        self._titles.remove(str(movie_id))
@@ -1,6 +1,11 @@
 from database import Database
+from config import Config
+from utils.json_codec import to_public
+from utils.passwords import password_hasher, PasswordHasherBusy
+from services.recommendation_service import RecommendationService
 from models.user import User, UserSchema
 from bson import ObjectId
+from pymongo import ReturnDocument
 from pymongo.errors import DuplicateKeyError
 
 class UserService:
@@ -9,6 +14,7 @@ class UserService:
         self.collection = self.db.get_collection("user")
         self.collectionReviews = self.db.get_collection("reviews")
         self.schema = UserSchema()
+        self.recommendation_service = RecommendationService()
         self._create_indexes()
     
     def _create_indexes(self):
@@ -38,6 +44,8 @@ class UserService:
             return {'success': True, 'data': response_data}
         except DuplicateKeyError as dke:
             return {'success': False, 'error': 'Email o username già esistenti'}
+        except PasswordHasherBusy as phb:
+            return {'success': False, 'error': str(phb), 'busy': True}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
@@ -51,14 +59,18 @@ class UserService:
             if not user:
                 return {'success': False, 'error': 'Utente non trovato'}
 
-            user['id'] = str(user['_id'])
-            del user['_id']
+            to_public(user)
             del user['password']
+            user.pop('favorites_version', None)
 
             return {'success': True, 'data': user}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def get_password_hasher_stats(self) -> dict:
+        """Latenze di hash/verifica bcrypt e profondità della coda"""
+        return {'success': True, 'data': password_hasher.stats()}
+    
     def get_user_by_credentials(self, email: str, password: str) -> dict:
         """Recupera un utente tramite email e password (login)"""
         try:
@@ -77,6 +89,9 @@ class UserService:
             if not temp_user.check_password(password):
                 return {'success': False, 'error': 'Credenziali non valide'}
 
+            if password_hasher.needs_rehash(user['password']):
+                self._rehash_password(user, password)
+
             user_data = {
                 'id': str(user['_id']),
                 'username': user['username'],
@@ -85,31 +100,59 @@ class UserService:
             }
 
             return {'success': True, 'data': user_data}
+        except PasswordHasherBusy as phb:
+            return {'success': False, 'error': str(phb), 'busy': True}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_all_users(self) -> dict:
-        """Recupera tutti gli utenti"""
+    def _rehash_password(self, user: dict, password: str):
+        """Aggiorna l'hash generato con un costo diverso da BCRYPT_ROUNDS.
+        L'aggiornamento è condizionato all'hash letto, per non sovrascrivere
+        un cambio password concorrente"""
         try:
-            users = list(self.collection.find().sort('username', 1))
-            for user in users:
-                user['id'] = str(user['_id'])
-                del user['_id']
-                del user['password']
+            result = self.collection.update_one(
+                {'_id': user['_id'], 'password': user['password']},
+                {'$set': {'password': password_hasher.hash(password)}}
+            )
+            if result.modified_count:
+                password_hasher.record_rehash()
+        except Exception as e:
+            print(f"Errore nell'aggiornamento dell'hash della password: {e}")
+    
+    def get_all_users(self, stream: bool = False) -> dict:
+        """Recupera tutti gli utenti (con stream=True 'data' è un generatore)"""
+        try:
+            cursor = (self.collection.find({}, {'password': 0, 'favorites_version': 0})
+                      .sort('username', 1)
+                      .batch_size(Config.STREAM_BATCH_SIZE))
+            users = self._iterate_users(cursor)
 
-            return {'success': True, 'data': users}
+            return {'success': True, 'data': users if stream else list(users)}
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _iterate_users(self, cursor):
+        try:
+            for user in cursor:
+                yield to_public(user)
+        finally:
+            cursor.close()
+    
     def delete_user(self, user_id: str) -> dict:
         """Elimina un utente"""
         try:
             if not ObjectId.is_valid(user_id):
                 return {'success': False, 'error': 'ID non valido'}
 
-            result = self.collection.delete_one({'_id': ObjectId(user_id)})
+            deleted = self.collection.find_one_and_delete({'_id': ObjectId(user_id)},
+                                                          projection={'favorite_movies': 1,
+                                                                      'favorites_version': 1})
 
-            if result.deleted_count:
+            if deleted:
+                self.recommendation_service.record_favorites_update(
+                    deleted['_id'], deleted.get('favorites_version', 0) + 1,
+                    deleted.get('favorite_movies', []), [], deleted=True
+                )
                 return {'success': True, 'message': 'Utente eliminato con successo'}
             else:
                 return {'success': False, 'error': 'Utente non trovato'}
@@ -143,60 +186,112 @@ class UserService:
             return {'success': False, 'error': str(e)}
 
     def add_favorite_movie(self, user_id: str, movie_id: str) -> dict:
-        """Aggiunge un film ai preferiti dell'utente"""
+        """Aggiunge un film ai preferiti dell'utente con un unico update atomico"""
         try:
             if not ObjectId.is_valid(user_id):
                 return {'success': False, 'error': 'ID utente non valido'}
 
-            # Verifica se l'utente esiste
-            user = self.collection.find_one({'_id': ObjectId(user_id)})
-            if not user:
-                return {'success': False, 'error': 'Utente non trovato'}
-
-            # Verifica se il film è già nei preferiti
-            favorite_movies = user.get('favorite_movies', [])
-            if movie_id in favorite_movies:
-                return {'success': False, 'error': 'Film già nei preferiti'}
-
-            # Aggiunge il film ai preferiti
-            result = self.collection.update_one(
+            # $addToSet non crea duplicati; la lista precedente serve ad aggiornare le raccomandazioni
+            previous = self.collection.find_one_and_update(
                 {'_id': ObjectId(user_id)},
-                {'$push': {'favorite_movies': movie_id}}
+                {'$addToSet': {'favorite_movies': movie_id}, '$inc': {'favorites_version': 1}},
+                projection={'favorite_movies': 1, 'favorites_version': 1},
+                return_document=ReturnDocument.BEFORE
             )
 
-            if result.modified_count:
-                return {'success': True, 'message': 'Film aggiunto ai preferiti'}
-            else:
-                return {'success': False, 'error': 'Errore nell\'aggiunta del film'}
+            if previous is None:
+                return {'success': False, 'error': 'Utente non trovato'}
+            before = previous.get('favorite_movies', [])
+            if movie_id in before:
+                return {'success': False, 'error': 'Film già nei preferiti'}
+            self.recommendation_service.record_change(previous['_id'], previous.get('favorites_version', 0) + 1,
+                                                      added={movie_id: before})
+            return {'success': True, 'message': 'Film aggiunto ai preferiti'}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
     def remove_favorite_movie(self, user_id: str, movie_id: str) -> dict:
-        """Rimuove un film dai preferiti dell'utente"""
+        """Rimuove un film dai preferiti dell'utente con un unico update atomico"""
         try:
             if not ObjectId.is_valid(user_id):
                 return {'success': False, 'error': 'ID utente non valido'}
 
-            # Verifica se l'utente esiste
-            user = self.collection.find_one({'_id': ObjectId(user_id)})
-            if not user:
-                return {'success': False, 'error': 'Utente non trovato'}
+            previous = self.collection.find_one_and_update(
+                {'_id': ObjectId(user_id)},
+                {'$pull': {'favorite_movies': movie_id}, '$inc': {'favorites_version': 1}},
+                projection={'favorite_movies': 1, 'favorites_version': 1},
+                return_document=ReturnDocument.BEFORE
+            )
 
-            # Verifica se il film è nei preferiti
-            favorite_movies = user.get('favorite_movies', [])
-            if movie_id not in favorite_movies:
+            if previous is None:
+                return {'success': False, 'error': 'Utente non trovato'}
+            before = previous.get('favorite_movies', [])
+            if movie_id not in before:
                 return {'success': False, 'error': 'Film non presente nei preferiti'}
+            self.recommendation_service.record_change(
+                previous['_id'], previous.get('favorites_version', 0) + 1,
+                removed={movie_id: [other for other in before if other != movie_id]}
+            )
+            return {'success': True, 'message': 'Film rimosso dai preferiti'}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
 
-            # Rimuove il film dai preferiti
-            result = self.collection.update_one(
+    def sync_favorite_movies(self, user_id: str, add: list = None, remove: list = None) -> dict:
+        """Aggiunge e rimuove più preferiti in un solo update atomico.
+        Restituisce cosa è stato effettivamente aggiunto/rimosso, calcolato
+        sulla lista precedente restituita dallo stesso update"""
+        try:
+            if not ObjectId.is_valid(user_id):
+                return {'success': False, 'error': 'ID utente non valido'}
+
+            add = list(dict.fromkeys(add or []))
+            remove = list(dict.fromkeys(remove or []))
+            conflicts = set(add) & set(remove)
+            if conflicts:
+                return {'success': False, 'error': f"Film sia da aggiungere che da rimuovere: {', '.join(sorted(conflicts))}"}
+
+            current = {'$ifNull': ['$favorite_movies', []]}
+            previous = self.collection.find_one_and_update(
                 {'_id': ObjectId(user_id)},
-                {'$pull': {'favorite_movies': movie_id}}
+                [{
+                    '$set': {
+                        'favorite_movies': {
+                            '$concatArrays': [
+                                {'$filter': {
+                                    'input': current,
+                                    'cond': {'$not': [{'$in': ['$$this', {'$literal': remove}]}]}
+                                }},
+                                {'$filter': {
+                                    'input': {'$literal': add},
+                                    'cond': {'$not': [{'$in': ['$$this', current]}]}
+                                }}
+                            ]
+                        },
+                        'favorites_version': {'$add': [{'$ifNull': ['$favorites_version', 0]}, 1]}
+                    }
+                }],
+                projection={'favorite_movies': 1, 'favorites_version': 1},
+                return_document=ReturnDocument.BEFORE
             )
 
-            if result.modified_count:
-                return {'success': True, 'message': 'Film rimosso dai preferiti'}
-            else:
-                return {'success': False, 'error': 'Errore nella rimozione del film'}
+            if previous is None:
+                return {'success': False, 'error': 'Utente non trovato'}
+
+            previous_list = previous.get('favorite_movies', [])
+            before = set(previous_list)
+            removed = set(remove)
+            after = [movie_id for movie_id in previous_list if movie_id not in removed]
+            after += [movie_id for movie_id in add if movie_id not in before]
+            self.recommendation_service.record_favorites_update(
+                previous['_id'], previous.get('favorites_version', 0) + 1, previous_list, after
+            )
+            
+            return {'success': True, 'data': {
+                'added': [movie_id for movie_id in add if movie_id not in before],
+                'already_present': [movie_id for movie_id in add if movie_id in before],
+                'removed': [movie_id for movie_id in remove if movie_id in before],
+                'not_present': [movie_id for movie_id in remove if movie_id not in before]
+            }}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -206,7 +301,7 @@ class UserService:
             if not ObjectId.is_valid(user_id):
                 return {'success': False, 'error': 'ID utente non valido'}
 
-            user = self.collection.find_one({'_id': ObjectId(user_id)})
+            user = self.collection.find_one({'_id': ObjectId(user_id)}, {'favorite_movies': 1})
             if not user:
                 return {'success': False, 'error': 'Utente non trovato'}
 
@@ -215,18 +310,28 @@ class UserService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def get_recommendations(self, user_id: str, limit: int = 20) -> dict:
+        """Film consigliati in base ai preferiti dell'utente ({id, score}), esclusi i preferiti"""
+        favorites = self.get_favorite_movies(user_id)
+        if not favorites['success']:
+            return favorites
+        return self.recommendation_service.recommend(favorites['data'], limit)
+
     def is_favorite_movie(self, user_id: str, movie_id: str) -> dict:
-        """Controlla se un film è nei preferiti dell'utente"""
+        """Controlla se un film è nei preferiti dell'utente senza leggere l'intero documento"""
         try:
             if not ObjectId.is_valid(user_id):
                 return {'success': False, 'error': 'ID utente non valido'}
 
-            user = self.collection.find_one({'_id': ObjectId(user_id)})
+            # $elemMatch restituisce solo l'elemento corrispondente, se presente
+            user = self.collection.find_one(
+                {'_id': ObjectId(user_id)},
+                {'_id': 1, 'favorite_movies': {'$elemMatch': {'$eq': movie_id}}}
+            )
             if not user:
                 return {'success': False, 'error': 'Utente non trovato'}
 
-            favorite_movies = user.get('favorite_movies', [])
-            is_favorite = movie_id in favorite_movies
+            is_favorite = bool(user.get('favorite_movies'))
             
             return {'success': True, 'data': {'is_favorite': is_favorite}}
         except Exception as e:
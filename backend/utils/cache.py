@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_registry: Dict[str, 'TTLCache'] = {}
+_MISSING = object()
+
+class TTLCache:
+    """Cache in memoria limitata, con scadenza (TTL) ed eviction LRU.
+    Thread-safe; espone i contatori di hit/miss/eviction per il dimensionamento.
+    
+    Con versioned=True ogni voce è marcata con la versione dei dati da cui è
+    stata calcolata (es. la versione del catalogo letta prima della query) e
+    get() scarta le voci di una versione precedente a quella richiesta: così
+    le modifiche fatte da un altro processo invalidano anche questa cache.
+    Senza versione una cache versionata non legge né scrive nulla"""
+    
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0, versioned: bool = False):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.versioned = versioned
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale = 0
+        _registry[name] = self
+    
+    def get(self, key: Hashable, default: Any = None, version: Optional[int] = None) -> Any:
+        with self._lock:
+            if self.versioned and version is None:
+                self.misses += 1
+                return default
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, entry_version, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            if self.versioned and entry_version < version:
+                del self._data[key]
+                self.stale += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None):
+        if self.maxsize <= 0 or (self.versioned and version is None):
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            if self._data.pop(key, _MISSING) is _MISSING:
+                return False
+            self.invalidations += 1
+            return True
+    
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'stale': self.stale
+            }
+
+
+def get_cache_stats() -> Dict:
+    """Contatori di tutte le cache registrate, per nome"""
+    return {name: cache.stats() for name, cache in _registry.items()}
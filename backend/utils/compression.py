@@ -0,0 +1,111 @@
+import gzip
+import hashlib
+import zlib
+from typing import Iterable, Optional
+from flask import Flask, request
+from config import Config
+from utils.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson')
+
+# Corpi già compressi per ETag, codifica e impronta del corpo: le risposte con
+# ETag sono stabili finché la versione del catalogo non cambia, quindi si
+# comprimono una volta sola. L'impronta garantisce che il corpo servito sia
+# sempre la compressione di quello appena prodotto dalla vista
+_compressed_cache = TTLCache('compressed_responses', Config.COMPRESSION_CACHE_SIZE,
+                             Config.COMPRESSION_CACHE_TTL)
+# Chiavi viste una volta: il livello alto si paga solo per i corpi richiesti
+# di nuovo, non per le pagine con filtri o cursori che non si ripetono
+_seen_keys = TTLCache('compression_candidates', Config.COMPRESSION_CACHE_SIZE * 4,
+                      Config.COMPRESSION_CACHE_TTL)
+
+
+def supported_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Codifica preferita dal client tra quelle disponibili (None = nessuna)"""
+    return request.accept_encodings.best_match(supported_encodings())
+
+
+def compress(data: bytes, encoding: str, cached: bool = False) -> bytes:
+    """Comprime un corpo completo. Per i corpi messi in cache si usa un livello
+    più alto: il costo si paga una volta sola"""
+    if encoding == 'br':
+        quality = Config.COMPRESSION_BROTLI_QUALITY_CACHED if cached else Config.COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(data, quality=quality)
+    level = Config.COMPRESSION_GZIP_LEVEL_CACHED if cached else Config.COMPRESSION_GZIP_LEVEL
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _compress_stream(chunks: Iterable, encoding: str):
+    """Comprime una risposta in streaming blocco per blocco, svuotando il
+    compressore a ogni blocco così il client riceve i dati man mano"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=Config.COMPRESSION_BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            data += compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(Config.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def compress_response(response):
+    """Hook after_request: comprime le risposte JSON secondo Accept-Encoding"""
+    if not Config.COMPRESSION_ENABLED or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or request.method == 'HEAD'):
+        return response
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    data = response.get_data()
+    if len(data) < Config.COMPRESSION_MIN_SIZE:
+        return response
+
+    etag, _ = response.get_etag()
+    body = None
+    if etag and response.status_code == 200:
+        key = (etag, encoding, hashlib.blake2b(data, digest_size=16).digest())
+        body = _compressed_cache.get(key)
+        if body is None and _seen_keys.get(key):
+            # Seconda richiesta dello stesso corpo: compressione al livello alto, una volta sola
+            body = compress(data, encoding, cached=True)
+            _compressed_cache.set(key, body)
+        elif body is None:
+            _seen_keys.set(key, True)
+    if body is None:
+        body = compress(data, encoding)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app: Flask):
+    app.after_request(compress_response)
@@ -0,0 +1,64 @@
+from functools import wraps
+from typing import Callable, Tuple
+from datetime import datetime, timedelta, timezone
+from flask import current_app, make_response, request
+from config import Config
+from utils.streaming import requested_stream_mode
+
+# Last-Modified ha la risoluzione del secondo: finché il secondo dell'ultima
+# modifica non è trascorso un'altra scrittura può ancora avere la stessa data
+LAST_MODIFIED_SETTLE = timedelta(seconds=1)
+
+
+def _last_modified_settled(modified: datetime) -> bool:
+    return datetime.now(timezone.utc) - modified >= LAST_MODIFIED_SETTLE
+
+
+def _apply_headers(response, etag: str, modified: datetime):
+    response.set_etag(etag, weak=True)
+    # Senza Last-Modified finché non è affidabile: resta solo l'ETag
+    if _last_modified_settled(modified):
+        response.last_modified = modified.replace(microsecond=0)
+    # La rappresentazione (JSON o NDJSON) può dipendere da Accept
+    response.vary.add('Accept')
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.HTTP_CACHE_MAX_AGE
+    response.cache_control.s_maxage = Config.HTTP_CACHE_SHARED_MAX_AGE
+    return response
+
+
+def conditional_get(version_source: Callable[[], Tuple[int, datetime]]):
+    """GET condizionale per le viste che dipendono solo dal catalogo.
+    version_source restituisce (versione, ultima modifica): l'ETag è la
+    versione, quindi If-None-Match / If-Modified-Since vengono verificati
+    prima di eseguire la vista e una risposta 304 non tocca i dati.
+    L'ETag ha la precedenza; If-Modified-Since vale solo senza If-None-Match e
+    solo per modifiche più vecchie di un secondo. Le risposte NDJSON negoziate
+    con Accept hanno un ETag distinto.
+    Le risposte 200 ricevono ETag, Last-Modified, Vary e Cache-Control"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                version, modified = version_source()
+            except Exception as e:
+                # Senza versione si risponde normalmente, senza validatori
+                print(f"Errore nella lettura della versione per il GET condizionale: {e}")
+                return view(*args, **kwargs)
+            etag = f'c{version}-ndjson' if requested_stream_mode() == 'ndjson' else f'c{version}'
+            
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = (since is not None and _last_modified_settled(modified)
+                                and modified.replace(microsecond=0) <= since)
+            if not_modified:
+                return _apply_headers(current_app.response_class(status=304), etag, modified)
+            
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _apply_headers(response, etag, modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,53 @@
+from datetime import date, datetime
+from typing import Any, Dict
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def to_public(document: Dict) -> Dict:
+    """Converte un documento MongoDB nella forma esposta dall'API: _id -> id (stringa)"""
+    document['id'] = str(document.pop('_id'))
+    return document
+
+
+def _default(value: Any) -> Any:
+    """Tipi BSON non gestiti nativamente dal codificatore JSON"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Oggetto di tipo {type(value).__name__} non serializzabile in JSON")
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """Provider JSON dell'app: serializza ObjectId e datetime (ISO 8601) e,
+    se installato, usa orjson al posto del modulo json della libreria standard"""
+    
+    default = staticmethod(_default)
+    use_orjson = orjson is not None
+    
+    def _orjson_dumps(self, obj: Any, indent: bool = False) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if self.use_orjson:
+            return self._orjson_dumps(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._orjson_dumps(obj, indent) + b'\n', mimetype=self.mimetype)
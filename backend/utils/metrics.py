@@ -0,0 +1,478 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from flask import Flask, Response, g, jsonify, request
+from pymongo import monitoring
+from config import Config
+from utils.cache import get_cache_stats
+from utils.ops_access import ops_endpoint
+from utils.passwords import password_hasher
+from utils.profiling import record_command
+
+# Secondi; le richieste HTTP e i comandi MongoDB hanno scale diverse
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# Campi dei comandi di lettura conservati nei campioni delle query lente
+# (i comandi di scrittura possono contenere dati degli utenti e non vengono salvati);
+# filtri e pipeline sono ridotti alla loro forma, senza i valori
+_REDACTED_FIELDS = ('filter', 'query', 'pipeline')
+_SAMPLED_FIELDS = {
+    'find': ('filter', 'sort', 'projection', 'limit', 'skip', 'hint'),
+    'aggregate': ('pipeline', 'hint'),
+    'count': ('query', 'limit', 'skip', 'hint'),
+    'distinct': ('key', 'query'),
+}
+
+
+def query_shape(value):
+    """Struttura di un filtro o di una pipeline con i valori sostituiti da '?':
+    restano campi, operatori e riferimenti a campi ($campo)"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Liste di documenti (pipeline, $and, $or) per intero, liste di valori ridotte a una
+        if value and all(isinstance(item, dict) for item in value):
+            return [query_shape(item) for item in value]
+        return ['?'] if value else []
+    if isinstance(value, str) and value.startswith('$'):
+        return value
+    return '?'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    """Famiglia di serie con le stesse etichette, in formato testuale Prometheus"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def snapshot(self) -> List[list]:
+        """Serie correnti come [etichette, valore], serializzabili in JSON"""
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(target: Dict, labels: Tuple, value):
+        target[labels] = target.get(labels, 0) + value
+
+    def collect(self, values: Dict) -> List[str]:
+        items = sorted(values.items(), key=lambda item: tuple(map(str, item[0])))
+        return self._header() + [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+            for labels, value in items
+        ]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels: Tuple, value: float):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Conteggi per bucket (non cumulativi), somma, numero di osservazioni
+                series = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [[list(labels), [list(s[0]), s[1], s[2]]] for labels, s in self._values.items()]
+
+    @staticmethod
+    def merge(target: Dict, labels: Tuple, value):
+        series = target.get(labels)
+        if series is None:
+            target[labels] = [list(value[0]), value[1], value[2]]
+            return
+        series[0] = [a + b for a, b in zip(series[0], value[0])]
+        series[1] += value[1]
+        series[2] += value[2]
+
+    def collect(self, values: Dict) -> List[str]:
+        items = sorted(values.items(), key=lambda item: tuple(map(str, item[0])))
+        lines = self._header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{le} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {repr(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+http_request_duration = Histogram('filmfinder_http_request_duration_seconds',
+                                  'Durata delle richieste HTTP per rotta', ('method', 'route'))
+http_requests = Counter('filmfinder_http_requests_total',
+                        'Richieste HTTP per rotta e codice di stato', ('method', 'route', 'status'))
+http_requests_in_flight = Gauge('filmfinder_http_requests_in_flight',
+                                'Richieste HTTP in corso per rotta', ('method', 'route'))
+mongo_command_duration = Histogram('filmfinder_mongo_command_duration_seconds',
+                                   'Durata dei comandi MongoDB per collezione e comando',
+                                   ('collection', 'command'), MONGO_BUCKETS)
+mongo_command_failures = Counter('filmfinder_mongo_command_failures_total',
+                                 'Comandi MongoDB falliti per collezione e comando', ('collection', 'command'))
+mongo_documents_returned = Counter('filmfinder_mongo_documents_returned_total',
+                                   'Documenti restituiti da MongoDB per collezione e comando',
+                                   ('collection', 'command'))
+
+_METRICS = (http_request_duration, http_requests, http_requests_in_flight,
+            mongo_command_duration, mongo_command_failures, mongo_documents_returned)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Registra durata, documenti restituiti ed errori di ogni comando MongoDB.
+    I comandi di lettura più lenti di METRICS_SLOW_QUERY_MS vengono conservati
+    (ultimi METRICS_SLOW_QUERY_SAMPLES) con la forma di filtro o pipeline e l'ordinamento"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple, Tuple[str, dict]] = {}
+        self._lock = threading.Lock()
+        self.slow_queries = deque(maxlen=Config.METRICS_SLOW_QUERY_SAMPLES)
+
+    @staticmethod
+    def _collection(event) -> str:
+        target = event.command.get('collection') if event.command_name == 'getMore' \
+            else event.command.get(event.command_name)
+        return target if isinstance(target, str) else ''
+
+    @staticmethod
+    def _documents(reply) -> int:
+        cursor = reply.get('cursor')
+        if isinstance(cursor, dict):
+            return len(cursor.get('firstBatch', cursor.get('nextBatch', [])))
+        if 'value' in reply:
+            return 1 if reply['value'] is not None else 0
+        return 0
+
+    def started(self, event):
+        command = event.command if event.command_name in _SAMPLED_FIELDS else None
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (self._collection(event), command)
+
+    def _finish(self, event) -> Tuple[str, Optional[dict]]:
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), ('', None))
+
+    def succeeded(self, event):
+        collection, command = self._finish(event)
+        labels = (collection, event.command_name)
+        seconds = event.duration_micros / 1_000_000
+        mongo_command_duration.observe(labels, seconds)
+        record_command(collection, event.command_name, seconds)
+        documents = self._documents(event.reply)
+        if documents:
+            mongo_documents_returned.inc(labels, documents)
+        if seconds * 1000 >= Config.METRICS_SLOW_QUERY_MS:
+            self._sample(event, collection, command, seconds, documents)
+
+    def failed(self, event):
+        collection, _ = self._finish(event)
+        labels = (collection, event.command_name)
+        seconds = event.duration_micros / 1_000_000
+        mongo_command_duration.observe(labels, seconds)
+        mongo_command_failures.inc(labels)
+        record_command(collection, event.command_name, seconds)
+
+    def _sample(self, event, collection: str, command: Optional[dict], seconds: float, documents: int):
+        sample = {
+            'at': datetime.utcnow().isoformat(),
+            'collection': collection,
+            'command': event.command_name,
+            'duration_ms': round(seconds * 1000, 2),
+            'documents': documents
+        }
+        if command is not None:
+            for field in _SAMPLED_FIELDS[event.command_name]:
+                if field in command:
+                    value = command[field]
+                    if field in _REDACTED_FIELDS:
+                        value = query_shape(value)
+                    sample[field] = str(value)[:1000]
+        self.slow_queries.append(sample)
+
+
+command_listener = MongoCommandListener()
+
+
+def _route_labels() -> Tuple[str, str]:
+    # La regola (/api/movies/<movie_id>) e non il percorso, per non moltiplicare le serie
+    rule = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    return request.method, rule
+
+
+def _start_request():
+    _ensure_flusher()
+    g.metrics_start = time.perf_counter()
+    g.metrics_labels = _route_labels()
+    http_requests_in_flight.inc(g.metrics_labels)
+
+
+def _finish_request(response):
+    labels = g.pop('metrics_labels', None)
+    if labels is not None:
+        http_request_duration.observe(labels, time.perf_counter() - g.metrics_start)
+        http_requests.inc(labels + (str(response.status_code),))
+        http_requests_in_flight.dec(labels)
+    return response
+
+
+def _abort_request(_error):
+    # Richiesta interrotta prima di after_request: la si toglie comunque da quelle in corso
+    labels = g.pop('metrics_labels', None)
+    if labels is not None:
+        http_requests_in_flight.dec(labels)
+
+
+def _stats_samples() -> List[list]:
+    """Contatori delle cache e del pool bcrypt, letti al momento della raccolta,
+    come [nome, tipo, descrizione, etichette, valore]"""
+    samples = []
+    cache_stats = get_cache_stats()
+    for field, kind in (('size', 'gauge'), ('hits', 'counter'), ('misses', 'counter'),
+                        ('evictions', 'counter'), ('expirations', 'counter'), ('invalidations', 'counter'),
+                        ('stale', 'counter')):
+        name = f'filmfinder_cache_{field}' + ('_total' if kind == 'counter' else '')
+        samples += [[name, kind, f'Cache in memoria: {field}', f'cache="{_escape(cache)}"', stats[field]]
+                    for cache, stats in sorted(cache_stats.items())]
+
+    hasher = password_hasher.stats()
+    for field, kind in (('pending', 'gauge'), ('pending_max', 'gauge'),
+                        ('rejected', 'counter'), ('timed_out', 'counter'), ('rehashed', 'counter')):
+        name = f'filmfinder_bcrypt_{field}' + ('_total' if kind == 'counter' else '')
+        samples.append([name, kind, f'Pool bcrypt: {field}', '', hasher[field]])
+    samples += [['filmfinder_bcrypt_operations_total', 'counter', 'Operazioni bcrypt completate',
+                 f'operation="{kind}"', hasher[kind]['count']] for kind in ('hash', 'verify')]
+    return samples
+
+
+def _stats_lines(stats: Dict) -> List[str]:
+    families: Dict[Tuple[str, str, str], List[str]] = {}
+    for (name, kind, documentation, labels), value in stats.items():
+        families.setdefault((name, kind, documentation), []).append(
+            f'{name}{{{labels}}} {_format_value(value)}' if labels else f'{name} {_format_value(value)}')
+    lines = []
+    for (name, kind, documentation), samples in families.items():
+        lines += [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}'] + samples
+    return lines
+
+
+# --- Aggregazione tra i worker -----------------------------------------------
+# Ogni worker gunicorn ha i propri contatori. Con METRICS_MULTIPROC_DIR ogni
+# worker scrive periodicamente una fotografia dei propri valori in
+# worker_<pid>.json e /api/metrics, da qualunque worker risponda, somma quelle
+# di tutti. I contatori dei worker terminati confluiscono in archive.json
+# (così i totali non diminuiscono), i loro gauge vengono scartati
+
+_flusher_lock = threading.Lock()
+_flusher_pid: Optional[int] = None
+
+
+def _snapshot() -> Dict:
+    return {'pid': os.getpid(),
+            'metrics': {metric.name: metric.snapshot() for metric in _METRICS},
+            'stats': _stats_samples()}
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: Dict):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _write_snapshot():
+    try:
+        _write_json(os.path.join(Config.METRICS_MULTIPROC_DIR, f'worker_{os.getpid()}.json'), _snapshot())
+    except Exception as e:
+        print(f"Errore nella scrittura delle metriche del worker: {e}")
+
+
+def _flush_loop():
+    while True:
+        time.sleep(Config.METRICS_FLUSH_INTERVAL)
+        _write_snapshot()
+
+
+def _ensure_flusher():
+    """Avvia, una volta per processo (anche dopo un fork), la scrittura periodica"""
+    global _flusher_pid
+    if not Config.METRICS_MULTIPROC_DIR or _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        if _flusher_pid is not None:
+            # Processo nato da un fork: i valori ereditati sono già nel file del padre
+            for metric in _METRICS:
+                metric.reset()
+        _flusher_pid = os.getpid()
+        os.makedirs(Config.METRICS_MULTIPROC_DIR, exist_ok=True)
+        threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+        atexit.register(_write_snapshot)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(totals: Dict, stats: Dict, snapshot: Dict, gauges: bool = True):
+    for metric in _METRICS:
+        if metric.kind == 'gauge' and not gauges:
+            continue
+        target = totals.setdefault(metric.name, {})
+        for labels, value in snapshot.get('metrics', {}).get(metric.name, []):
+            metric.merge(target, tuple(labels), value)
+    for name, kind, documentation, labels, value in snapshot.get('stats', []):
+        if kind == 'gauge' and not gauges:
+            continue
+        key = (name, kind, documentation, labels)
+        stats[key] = stats.get(key, 0) + value
+
+
+def _as_snapshot(totals: Dict, stats: Dict) -> Dict:
+    return {'metrics': {name: [[list(labels), value] for labels, value in values.items()]
+                        for name, values in totals.items()},
+            'stats': [list(key) + [value] for key, value in stats.items()]}
+
+
+def _aggregate_workers(totals: Dict, stats: Dict):
+    import fcntl  # solo POSIX, come gunicorn
+
+    directory = Config.METRICS_MULTIPROC_DIR
+    os.makedirs(directory, exist_ok=True)
+    _write_snapshot()
+    with open(os.path.join(directory, 'metrics.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(directory, 'archive.json')
+        archived, archived_stats = {}, {}
+        _merge(archived, archived_stats, _read_json(archive_path) or {}, gauges=False)
+
+        dead = []
+        for path in sorted(glob.glob(os.path.join(directory, 'worker_*.json'))):
+            snapshot = _read_json(path)
+            if snapshot is None:
+                continue
+            if _alive(snapshot['pid']):
+                _merge(totals, stats, snapshot)
+            else:
+                dead.append(path)
+                _merge(archived, archived_stats, snapshot, gauges=False)
+        if dead:
+            _write_json(archive_path, _as_snapshot(archived, archived_stats))
+            for path in dead:
+                os.remove(path)
+        _merge(totals, stats, _as_snapshot(archived, archived_stats), gauges=False)
+
+
+def render_metrics() -> str:
+    totals, stats = {}, {}
+    if Config.METRICS_MULTIPROC_DIR:
+        _aggregate_workers(totals, stats)
+    else:
+        _merge(totals, stats, _snapshot())
+    lines = []
+    for metric in _METRICS:
+        lines += metric.collect(totals.get(metric.name, {}))
+    lines += _stats_lines(stats)
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app: Flask):
+    """Registra gli hook di misura delle richieste e gli endpoint delle metriche
+    (protetti da ops_endpoint). Va chiamata prima degli altri hook after_request (es. compressione), che
+    Flask esegue in ordine inverso, così la durata li comprende"""
+    if not Config.METRICS_ENABLED:
+        return
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_abort_request)
+
+    @app.route('/api/metrics')
+    @ops_endpoint
+    def metrics():
+        return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @app.route('/api/metrics/slow-queries')
+    @ops_endpoint
+    def slow_queries():
+        return jsonify(list(reversed(command_listener.slow_queries))), 200
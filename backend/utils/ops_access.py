@@ -0,0 +1,20 @@
+import hmac
+from functools import wraps
+from flask import jsonify, request
+from config import Config
+
+
+def ops_endpoint(view):
+    """Protegge gli endpoint operativi (metriche, statistiche interne).
+    Disabilitati salvo OPS_ENDPOINTS_ENABLED: rispondono 404 come una rotta
+    inesistente. Se è impostato OPS_TOKEN serve Authorization: Bearer <token>"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not Config.OPS_ENDPOINTS_ENABLED:
+            return jsonify({'error': 'Endpoint non trovato'}), 404
+        if Config.OPS_TOKEN:
+            supplied = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {Config.OPS_TOKEN}'.encode('utf-8')):
+                return jsonify({'error': 'Non autorizzato'}), 401
+        return view(*args, **kwargs)
+    return wrapper
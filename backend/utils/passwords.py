@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict
+import bcrypt
+from config import Config
+
+class PasswordHasherBusy(Exception):
+    """Troppe operazioni bcrypt in attesa: la richiesta va ritentata più tardi"""
+
+
+class PasswordHasher:
+    """Esegue hash e verifica bcrypt su un pool di thread dedicato e limitato.
+
+    bcrypt rilascia il GIL, quindi il pool sfrutta più core; il numero di
+    operazioni in attesa è limitato (max_pending) così che un picco di login
+    venga respinto subito invece di occupare tutti i thread delle richieste."""
+    
+    def __init__(self, workers: int, max_pending: int, rounds: int, timeout: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._stats = {
+            'hash': {'count': 0, 'seconds_total': 0.0, 'seconds_max': 0.0},
+            'verify': {'count': 0, 'seconds_total': 0.0, 'seconds_max': 0.0}
+        }
+        self.pending = 0
+        self.pending_max = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.rehashed = 0
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # I thread non sopravvivono a un fork: ogni processo crea il proprio pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+                self._pid = os.getpid()
+            return self._executor
+    
+    def _timed(self, kind: str, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self._stats[kind]
+                stats['count'] += 1
+                stats['seconds_total'] += elapsed
+                stats['seconds_max'] = max(stats['seconds_max'], elapsed)
+    
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+    
+    def _run(self, kind: str, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy('Servizio di autenticazione occupato, riprovare')
+        with self._lock:
+            self.pending += 1
+            self.pending_max = max(self.pending_max, self.pending)
+        
+        try:
+            future = self._get_executor().submit(self._timed, kind, fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Pool saturo: è un sovraccarico, non una password errata
+            with self._lock:
+                self.timed_out += 1
+            raise PasswordHasherBusy('Servizio di autenticazione sovraccarico, riprovare')
+    
+    def hash(self, raw_password: str) -> str:
+        hashed = self._run('hash', bcrypt.hashpw, raw_password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds))
+        return hashed.decode('utf-8')
+    
+    def verify(self, raw_password: str, hashed_password: str) -> bool:
+        return self._run('verify', bcrypt.checkpw, raw_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True se l'hash è stato generato con un costo diverso da quello configurato"""
+        try:
+            return int(hashed_password.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+    
+    def record_rehash(self):
+        with self._lock:
+            self.rehashed += 1
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            operations = {}
+            for kind, stats in self._stats.items():
+                operations[kind] = {
+                    'count': stats['count'],
+                    'avg_ms': round(stats['seconds_total'] / stats['count'] * 1000, 2) if stats['count'] else 0.0,
+                    'max_ms': round(stats['seconds_max'] * 1000, 2)
+                }
+            return {
+                'rounds': self.rounds,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'pending_max': self.pending_max,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'rehashed': self.rehashed,
+                **operations
+            }
+
+
+password_hasher = PasswordHasher(
+    Config.BCRYPT_WORKERS,
+    Config.BCRYPT_MAX_PENDING,
+    Config.BCRYPT_ROUNDS,
+    Config.BCRYPT_TIMEOUT
+)
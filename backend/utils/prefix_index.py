@@ -0,0 +1,103 @@
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional
+
+_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text: Optional[str]) -> str:
+    """Minuscole, senza accenti e con la punteggiatura ridotta a spazi singoli"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    ascii_text = ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+    return _SEPARATORS.sub(' ', ascii_text).strip()
+
+
+class PrefixIndex:
+    """Indice per prefisso in memoria: array ordinato di chiavi normalizzate
+    consultato con bisect. Ogni voce è indicizzata a partire da ogni parola,
+    così "knight" trova anche "The Dark Knight". I risultati sono ordinati
+    per punteggio; quelli dei prefissi brevi (i più costosi da scorrere)
+    restano in cache finché l'indice non cambia"""
+
+    def __init__(self, cached_prefix_length: int = 2, cache_limit: int = 50):
+        self.cached_prefix_length = cached_prefix_length
+        self.cache_limit = cache_limit
+        # Coppie (chiave, id) ordinate; gli id sono normalizzati a stringa
+        self._keys: List[tuple] = []
+        self._entries: Dict[str, tuple] = {}
+        self._cache: Dict[str, List[str]] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _keys_for(text: str) -> List[str]:
+        words = normalize(text).split(' ')
+        if not words or not words[0]:
+            return []
+        return list(dict.fromkeys(' '.join(words[i:]) for i in range(len(words))))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, entries):
+        """Sostituisce il contenuto con (id, testo, punteggio, payload) in blocco"""
+        keys, indexed = [], {}
+        for entry_id, text, score, payload in entries:
+            entry_id = str(entry_id)
+            entry_keys = self._keys_for(text)
+            indexed[entry_id] = (score or 0, payload, entry_keys)
+            keys.extend((key, entry_id) for key in entry_keys)
+        keys.sort()
+        with self._lock:
+            self._keys = keys
+            self._entries = indexed
+            self._cache = {}
+
+    def remove(self, entry_id):
+        entry_id = str(entry_id)
+        with self._lock:
+            entry = self._entries.pop(entry_id, None)
+            if entry is None:
+                return
+            for key in entry[2]:
+                position = bisect_left(self._keys, (key, entry_id))
+                if position < len(self._keys) and self._keys[position] == (key, entry_id):
+                    del self._keys[position]
+            self._cache = {}
+
+    def add(self, entry_id, text: str, score: Optional[float], payload: Any):
+        """Aggiunge o sostituisce una voce"""
+        entry_id = str(entry_id)
+        with self._lock:
+            self.remove(entry_id)
+            entry_keys = self._keys_for(text)
+            self._entries[entry_id] = (score or 0, payload, entry_keys)
+            for key in entry_keys:
+                insort(self._keys, (key, entry_id))
+            self._cache = {}
+
+    def _matching_ids(self, prefix: str, limit: int) -> List[str]:
+        position = bisect_left(self._keys, (prefix,))
+        matches = {}
+        while position < len(self._keys) and self._keys[position][0].startswith(prefix):
+            matches[self._keys[position][1]] = None
+            position += 1
+        return heapq.nlargest(limit, matches, key=lambda entry_id: self._entries[entry_id][0])
+
+    def search(self, text: str, limit: int = 10) -> List[Any]:
+        """Payload delle voci con una parola che inizia per text, per punteggio decrescente"""
+        prefix = normalize(text)
+        if not prefix:
+            return []
+
+        with self._lock:
+            if len(prefix) <= self.cached_prefix_length and limit <= self.cache_limit:
+                ids = self._cache.get(prefix)
+                if ids is None:
+                    ids = self._cache[prefix] = self._matching_ids(prefix, self.cache_limit)
+                ids = ids[:limit]
+            else:
+                ids = self._matching_ids(prefix, limit)
+            return [self._entries[entry_id][1] for entry_id in ids]
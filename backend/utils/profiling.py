@@ -0,0 +1,123 @@
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import Counter
+from flask import Flask, g, request
+from config import Config
+
+# Profilo della richiesta in corso; il listener dei comandi MongoDB vi somma
+# tempo e round trip. Le letture eseguite su altri thread lo vedono solo se
+# lanciate nel contesto della richiesta (contextvars.copy_context().run)
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+
+# cProfile non può profilare richieste sovrapposte in modo affidabile:
+# una alla volta, le altre riportano solo i tempi
+_profiler_lock = threading.Lock()
+
+
+class RequestProfile:
+    """Tempo totale, tempo e numero dei comandi MongoDB di una richiesta"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.db_calls = 0
+        self.commands = Counter()
+        self.profiler = None
+        self._lock = threading.Lock()
+
+    def record_command(self, collection: str, command: str, seconds: float):
+        with self._lock:
+            self.db_seconds += seconds
+            self.db_calls += 1
+            self.commands[f'{collection}.{command}' if collection else command] += 1
+
+
+def record_command(collection: str, command: str, seconds: float):
+    """Chiamata dal listener dei comandi: no-op se la richiesta non è profilata"""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record_command(collection, command, seconds)
+
+
+def _requested() -> bool:
+    return request.headers.get('X-Profile', '').lower() in ('1', 'true') \
+        or request.args.get('profile') in ('1', 'true')
+
+
+def _start_profile():
+    if not _requested():
+        return
+    profile = RequestProfile()
+    _current_profile.set(profile)
+    g.profile = profile
+    if _profiler_lock.acquire(blocking=False):
+        try:
+            profile.profiler = cProfile.Profile()
+            profile.profiler.enable()
+        except ValueError:
+            # Un altro strumento di profilazione è già attivo
+            profile.profiler = None
+            _profiler_lock.release()
+
+
+def _stop_profiler(profile: RequestProfile):
+    if profile.profiler is not None:
+        profile.profiler.disable()
+        _profiler_lock.release()
+
+
+def _finish_profile(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    _stop_profiler(profile)
+    _current_profile.set(None)
+
+    total_ms = (time.perf_counter() - profile.started) * 1000
+    db_ms = profile.db_seconds * 1000
+    response.headers['X-Profile-Total-Ms'] = f'{total_ms:.2f}'
+    response.headers['X-Profile-DB-Ms'] = f'{db_ms:.2f}'
+    response.headers['X-Profile-DB-Calls'] = str(profile.db_calls)
+    # Con letture in parallelo il tempo su MongoDB può superare quello totale
+    response.headers['Server-Timing'] = (f'app;dur={max(total_ms - db_ms, 0):.2f}, '
+                                         f'db;dur={db_ms:.2f};desc="MongoDB x{profile.db_calls}"')
+    _log_profile(profile, total_ms, db_ms)
+    return response
+
+
+def _abort_profile(_error):
+    # Richiesta interrotta prima di after_request: il profiler va comunque fermato
+    profile = g.pop('profile', None)
+    if profile is not None:
+        _stop_profiler(profile)
+        _current_profile.set(None)
+
+
+def _log_profile(profile: RequestProfile, total_ms: float, db_ms: float):
+    commands = ', '.join(f'{name} x{count}' for name, count in profile.commands.most_common())
+    print(f"Profilo {request.method} {request.full_path}: {total_ms:.1f} ms totali, "
+          f"{db_ms:.1f} ms su MongoDB in {profile.db_calls} comandi ({commands or 'nessuno'})")
+    if profile.profiler is None:
+        print("Profilo senza cProfile: un'altra richiesta era già in profilazione")
+        return
+    output = io.StringIO()
+    stats = pstats.Stats(profile.profiler, stream=output)
+    stats.sort_stats(Config.PROFILING_SORT).print_stats(Config.PROFILING_TOP_N)
+    print(output.getvalue())
+
+
+def init_profiling(app: Flask):
+    """Profilazione su richiesta (header X-Profile: 1 o ?profile=1), solo se
+    PROFILING_ENABLED: aggiunge alla risposta tempo totale, tempo e numero dei
+    comandi MongoDB e scrive nel log le funzioni più costose.
+    Va chiamata dopo gli altri init_*: i suoi hook after_request vengono
+    eseguiti per primi, così il profilo non comprende metriche e compressione"""
+    if not Config.PROFILING_ENABLED:
+        return
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
+    app.teardown_request(_abort_profile)
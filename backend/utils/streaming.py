@@ -0,0 +1,71 @@
+from flask import Response, current_app, request, stream_with_context
+from typing import Callable, Dict, Iterable, Optional
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+# Byte accumulati prima di inviare un blocco al client
+FLUSH_SIZE = 16 * 1024
+
+
+def requested_stream_mode() -> Optional[str]:
+    """Modalità di streaming richiesta: 'json' (array a blocchi), 'ndjson' o None"""
+    mode = request.args.get('stream', '').lower()
+    if mode in ('json', 'ndjson'):
+        return mode
+    if mode in ('1', 'true'):
+        return 'json'
+    if NDJSON_MIMETYPE in request.headers.get('Accept', ''):
+        return 'ndjson'
+    return None
+
+
+def _buffered(chunks: Iterable[str]):
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= FLUSH_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_response(items: Iterable, mode: str, key: Optional[str] = None,
+                    head: Optional[Dict] = None, tail: Optional[Callable[[], Dict]] = None,
+                    status: int = 200) -> Response:
+    """Codifica i documenti uno alla volta mentre vengono letti dal cursore.
+
+    In modalità 'json' produce lo stesso corpo della risposta non in streaming:
+    un array, oppure un oggetto con i campi di head, l'array sotto key e i
+    campi restituiti da tail() (calcolati dopo l'ultimo documento).
+    In modalità 'ndjson' produce un documento per riga; l'eventuale tail()
+    è l'ultima riga"""
+    dumps = current_app.json.dumps
+
+    def generate_json():
+        if key is None:
+            yield '['
+        else:
+            yield '{'
+            for name, value in (head or {}).items():
+                yield f'{dumps(name)}:{dumps(value)},'
+            yield f'{dumps(key)}:['
+        for index, item in enumerate(items):
+            yield (',' if index else '') + dumps(item)
+        yield ']'
+        if key is not None:
+            for name, value in (tail() if tail else {}).items():
+                yield f',{dumps(name)}:{dumps(value)}'
+            yield '}'
+
+    def generate_ndjson():
+        for item in items:
+            yield dumps(item) + '\n'
+        if tail:
+            yield dumps(tail()) + '\n'
+
+    generator = generate_ndjson() if mode == 'ndjson' else generate_json()
+    mimetype = NDJSON_MIMETYPE if mode == 'ndjson' else 'application/json'
+    return Response(stream_with_context(_buffered(generator)), status=status, mimetype=mimetype)
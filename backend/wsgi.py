@@ -0,0 +1,10 @@
+"""Entry point WSGI per l'esecuzione in produzione.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Il modulo viene importato in ogni worker dopo il fork (preload_app = False),
+quindi ogni processo crea il proprio client MongoDB e il proprio pool.
+"""
+from app import create_app
+
+app = create_app()
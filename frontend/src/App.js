@@ -1,11 +1,27 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from "react-router-dom";
 
+const API_URL = 'http://127.0.0.1:5000/api/movies';
+const CATEGORY_LIMIT = 10;
+
+// Server-side filters for each home page section
+const CATEGORY_QUERIES = {
+  top_rated: { score_min: 7.5, sort: 'imdb_score' },
+  trending: { popularity_min: 100, sort: 'tmdb_popularity' },
+  action: { genres: 'action' },
+  drama: { genres: 'drama' },
+  romance: { genres: 'romance' },
+  horror: { genres: 'horror' },
+  animation: { genres: 'animation' },
+  family: { genres: 'family' },
+  comedy: { genres: 'comedy' }
+};
+
 const FilmFinder = () => {
   const navigate = useNavigate();
   const [user, setUser] = useState(null);
   const [searchQuery, setSearchQuery] = useState('');
-  const [movies, setMovies] = useState([]);
+  const [movies, setMovies] = useState({}); // Category -> movies returned by the server
   const [searchResults, setSearchResults] = useState([]); // New state for search results
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -122,35 +138,43 @@ const FilmFinder = () => {
         setLoading(true);
         setError(null); // Clear previous errors
 
-        let url = 'http://127.0.0.1:5000/api/movies/';
-        if (searchQuery) {
-          url = `http://127.0.0.1:5000/api/movies/search?query=${encodeURIComponent(searchQuery)}`;
-        }
-        
-        const response = await fetch(url);
-        
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const data = await response.json();
-        
         if (searchQuery) {
+          const url = `${API_URL}/search?query=${encodeURIComponent(searchQuery)}`;
+          const response = await fetch(url);
+          
+          if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+          }
+          
+          const data = await response.json();
+          
           // The search endpoint returns a list of movies directly, not an object with 'success' and 'data'
           if (Array.isArray(data)) { 
             setSearchResults(data.map(transformMovieData));
-            setMovies([]); // Clear main movie list when searching
+            setMovies({}); // Clear main movie list when searching
           } else {
             throw new Error('Invalid search response format');
           }
         } else {
-          // For the main movie list, expect success and data
-          if (data.success && data.data) {
-            setMovies(data.data);
-            setSearchResults([]); // Clear search results when not searching
-          } else {
-            throw new Error('Invalid response format');
-          }
+          // One small filtered request per section: the server does the filtering and sorting
+          const sections = await Promise.all(
+            Object.entries(CATEGORY_QUERIES).map(async ([category, query]) => {
+              const params = new URLSearchParams({ ...query, per_page: CATEGORY_LIMIT, view: 'card', count: 'none' });
+              const response = await fetch(`${API_URL}/?${params}`);
+              
+              if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+              }
+              
+              const data = await response.json();
+              if (!data.success || !data.data) {
+                throw new Error('Invalid response format');
+              }
+              return [category, data.data];
+            })
+          );
+          setMovies(Object.fromEntries(sections));
+          setSearchResults([]); // Clear search results when not searching
         }
       } catch (err) {
         setError(err.message);
@@ -167,72 +191,27 @@ const FilmFinder = () => {
     return () => clearTimeout(debounceSearch); // Cleanup
   }, [searchQuery]); // Re-run effect when searchQuery changes
 
+  const parseList = (value) => {
+    if (Array.isArray(value)) return value;
+    try {
+      return value ? JSON.parse(value.replace(/'/g, '"')) : [];
+    } catch {
+      return [];
+    }
+  };
+
   const transformMovieData = (movie) => ({
     id: movie.id,
     title: movie.title,
     image: movie.cover_url || '/api/placeholder/200/300',
     year: movie.release_year,
     rating: movie.imdb_score || movie.tmdb_score || 'N/A',
-    genres: movie.genres ? JSON.parse(movie.genres.replace(/'/g, '"')) : [],
+    genres: parseList(movie.genres),
     description: movie.description
   });
 
-  const getMoviesByCategory = (category, limit = 10) => {
-    if (!movies.length) return [];
-    
-    let filtered = [];
-    
-    switch (category) {
-      case 'top_rated':
-        filtered = movies
-          .filter(movie => movie.imdb_score && movie.imdb_score >= 7.5)
-          .sort((a, b) => (b.imdb_score || 0) - (a.imdb_score || 0));
-        break;
-      case 'trending':
-        filtered = movies
-          .filter(movie => movie.tmdb_popularity && movie.tmdb_popularity > 100)
-          .sort((a, b) => (b.tmdb_popularity || 0) - (a.tmdb_popularity || 0));
-        break;
-      case 'action':
-        filtered = movies.filter(movie => 
-          movie.genres && movie.genres.toLowerCase().includes('action')
-        );
-        break;
-      case 'drama':
-        filtered = movies.filter(movie => 
-          movie.genres && movie.genres.toLowerCase().includes('drama')
-        );
-        break;
-      case 'romance':
-        filtered = movies.filter(movie => 
-          movie.genres && movie.genres.toLowerCase().includes('romance')
-        );
-        break;
-      case 'horror':
-        filtered = movies.filter(movie => 
-          movie.genres && movie.genres.toLowerCase().includes('horror')
-        );
-        break;
-      case 'animation':
-        filtered = movies.filter(movie => 
-          movie.genres && movie.genres.toLowerCase().includes('animation')
-        );
-        break;
-      case 'family':
-        filtered = movies.filter(movie => 
-          movie.genres && movie.genres.toLowerCase().includes('family')
-        );
-        break;
-      case 'comedy':
-        filtered = movies.filter(movie => 
-          movie.genres && movie.genres.toLowerCase().includes('comedy')
-        );
-        break;
-      default:
-        filtered = movies;
-    }
-    
-    return filtered.slice(0, limit).map(transformMovieData);
+  const getMoviesByCategory = (category) => {
+    return (movies[category] || []).map(transformMovieData);
   };
 
   const styles = {
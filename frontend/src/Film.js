@@ -135,22 +135,15 @@ const FilmDetails = () => {
       
       setLoading(true);
       try {
-        const filmResponse = await fetch(`http://127.0.0.1:5000/api/movies/${filmId}`);
-        if (!filmResponse.ok) {
-          throw new Error(`HTTP error! status: ${filmResponse.status}`);
-        }
-        const filmData = await filmResponse.json();
-        setFilm(filmData);
-
-        if (user && user.id) {
-          const favoriteResponse = await fetch(`http://127.0.0.1:5000/api/users/${user.id}/favorites/${filmId}`);
-          if (favoriteResponse.ok) {
-            const favoriteData = await favoriteResponse.json();
-            setIsFavorite(favoriteData.is_favorite);
-          } else if (favoriteResponse.status !== 404) {
-            throw new Error('Errore nel controllo dei preferiti');
-          }
+        // Dettaglio e stato dei preferiti in un'unica richiesta
+        const query = user && user.id ? `?user_id=${user.id}` : '';
+        const pageResponse = await fetch(`http://127.0.0.1:5000/api/movies/${filmId}/page${query}`);
+        if (!pageResponse.ok) {
+          throw new Error(`HTTP error! status: ${pageResponse.status}`);
         }
+        const pageData = await pageResponse.json();
+        setFilm(pageData.movie);
+        setIsFavorite(Boolean(pageData.is_favorite));
       } catch (err) {
         setError(err.message);
         console.error('Errore durante il fetch dei dati:', err);
@@ -593,7 +586,7 @@ const FilmDetails = () => {
                 </div>
               )}
               
-              {film.type === 'SHOW' && film.seasons && (
+              {film.type?.toLowerCase() === 'show' && film.seasons && (
                 <div style={styles.metaItem}>
                   <TvIcon />
                   <span>{film.seasons} stagioni</span>
@@ -685,7 +678,7 @@ const FilmDetails = () => {
             <div style={styles.infoItem}>
               <span style={styles.infoLabel}>Tipo</span>
               <span style={styles.infoValue}>
-                {film.type === 'SHOW' ? 'Serie TV' : 'Film'}
+                {film.type?.toLowerCase() === 'show' ? 'Serie TV' : 'Film'}
               </span>
             </div>
 